@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import DailyBrandSales, DailyProductSales, DailySales
+
+# Register your models here.
+
+admin.site.register(DailySales)
+admin.site.register(DailyProductSales)
+admin.site.register(DailyBrandSales)
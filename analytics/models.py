@@ -0,0 +1,74 @@
+from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from orders.models import Order
+from store.models import Product
+
+
+class SalesTotals(models.Model):
+    """Counters shared by every rollup: orders, units sold and revenue."""
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesTotals):
+    day = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f"{self.day}: {self.revenue}"
+
+
+class DailyProductSales(SalesTotals):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta:
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} product {self.product_id}: {self.revenue}"
+
+
+class DailyBrandSales(SalesTotals):
+    day = models.DateField()
+    brand = models.CharField(max_length=50)
+
+    class Meta:
+        verbose_name_plural = 'daily brand sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'brand'], name='daily_brand_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.brand}: {self.revenue}"
+
+
+class RolledUpOrder(models.Model):
+    """
+    Marks an order whose items are currently counted in the rollups, so
+    syncing an order twice (a retried job, a backfill) never counts it twice.
+    A plain id rather than a foreign key: rollups outlive archived orders.
+    """
+    order_id = models.BigIntegerField(primary_key=True)
+
+    def __str__(self):
+        return f"Order {self.order_id}"
+
+
+@receiver(post_save, sender=Order)
+def queue_sales_rollup(sender, instance, created, **kwargs):
+    if created or instance.status != getattr(instance, '_stored_status', None):
+        from jobs.queue import enqueue
+        # Runs after the checkout commits, when the order's items exist.
+        enqueue('analytics.sync_order', {'order_id': instance.pk}, key=f'analytics.sync_order:{instance.pk}')
+    instance._stored_status = instance.status
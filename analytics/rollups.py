@@ -0,0 +1,120 @@
+"""
+Sales rollups: revenue, units and orders per day, per day and product, and
+per day and brand.
+
+The rollup tables are maintained incrementally: saving an order queues
+``analytics.sync_order``, which adds the order's items to the rollups when
+it starts counting (created, or moved out of an excluded status) and takes
+them out again when it stops. ``RolledUpOrder`` records which orders are
+counted, so every sync is idempotent. ``roll_up_chunk`` reconciles existing
+orders in id order for the ``backfill_sales`` command, from the live
+tables and from the archive (``orders.archive``).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .models import DailyBrandSales, DailyProductSales, DailySales, RolledUpOrder
+
+COUNTERS = ('orders', 'units', 'revenue')
+# Rollup rows changed per UPDATE statement.
+UPDATE_BATCH = 200
+
+
+def counts_as_sale(status):
+    return status not in getattr(settings, 'SALES_EXCLUDED_STATUSES', ('cancelled', 'refunded'))
+
+
+def _increment(model, keys, rows, sign):
+    """Add (``sign`` 1) or subtract (-1) aggregated ``rows`` into ``model``'s counters."""
+    rows = list(rows)
+    if not rows:
+        return
+    # Make sure every row exists, then move all counters with one UPDATE per batch.
+    model.objects.bulk_create(
+        [model(**{key: row[key] for key in keys}) for row in rows],
+        ignore_conflicts=True,
+    )
+    for start in range(0, len(rows), UPDATE_BATCH):
+        batch = rows[start:start + UPDATE_BATCH]
+        matches = [Q(**{key: row[key] for key in keys}) for row in batch]
+        any_row = Q()
+        for match in matches:
+            any_row |= match
+        changes = {}
+        for counter in COUNTERS:
+            output = DecimalField(max_digits=12, decimal_places=2) if counter == 'revenue' else IntegerField()
+            changes[counter] = F(counter) + Case(
+                *[When(match, then=Value(sign * row[counter])) for match, row in zip(matches, batch)],
+                output_field=output,
+            )
+        model.objects.filter(any_row).update(**changes)
+        if sign < 0:
+            model.objects.filter(any_row, orders=0).delete()
+
+
+def _roll_up(order_ids, sign, item_model=OrderItem):
+    """Add or remove the items of ``order_ids`` in every rollup with one aggregate per table."""
+    items = (
+        item_model.objects.filter(order_id__in=order_ids)
+        .annotate(day=TruncDate('order__created_at'))
+        .order_by()
+    )
+    totals = {
+        'orders': Count('order', distinct=True),
+        'units': Sum('quantity'),
+        'revenue': Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    }
+    _increment(DailySales, ['day'], items.values('day').annotate(**totals), sign)
+    _increment(DailyProductSales, ['day', 'product_id'], items.values('day', 'product_id').annotate(**totals), sign)
+    _increment(DailyBrandSales, ['day', 'brand'], items.values('day', brand=F('product__brand')).annotate(**totals), sign)
+
+
+def _reconcile(orders, item_model=OrderItem):
+    """
+    Count or uncount each ``(id, status)`` as its status says, reading its
+    lines from ``item_model``; call inside a transaction holding the orders'
+    row locks. Returns ``(added, removed)``.
+    """
+    counted = set(RolledUpOrder.objects.filter(pk__in=[pk for pk, _ in orders]).values_list('pk', flat=True))
+    add = [pk for pk, status in orders if counts_as_sale(status) and pk not in counted]
+    remove = [pk for pk, status in orders if not counts_as_sale(status) and pk in counted]
+    if add:
+        _roll_up(add, 1, item_model)
+        RolledUpOrder.objects.bulk_create([RolledUpOrder(order_id=pk) for pk in add])
+    if remove:
+        _roll_up(remove, -1, item_model)
+        RolledUpOrder.objects.filter(pk__in=remove).delete()
+    return len(add), len(remove)
+
+
+@transaction.atomic
+def sync_order(order_id):
+    """Bring the rollups in line with one order's current status."""
+    orders = list(Order.objects.filter(pk=order_id).select_for_update().values_list('pk', 'status'))
+    return _reconcile(orders)
+
+
+@transaction.atomic
+def roll_up_chunk(after_id=0, size=500, archived=False):
+    """
+    Reconcile the next ``size`` orders with an id above ``after_id``, from
+    the archive when ``archived`` is set (archived orders keep their ids).
+    Returns ``(last id, added, removed)``, or None when no orders are left.
+    """
+    order_model, item_model = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, OrderItem)
+    orders = list(
+        order_model.objects.filter(pk__gt=after_id).order_by('pk')
+        .select_for_update().values_list('pk', 'status')[:size]
+    )
+    if not orders:
+        return None
+    return (orders[-1][0], *_reconcile(orders, item_model))
+
+
+@transaction.atomic
+def clear():
+    """Empty every rollup, for a rebuild from scratch."""
+    for model in (DailySales, DailyProductSales, DailyBrandSales, RolledUpOrder):
+        model.objects.all().delete()
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+GROUPS = ('day', 'product', 'brand')
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    """Query parameters of the sales report; the range defaults to the last 30 days."""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    group = serializers.ChoiceField(choices=GROUPS, default='day')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=29))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        return data
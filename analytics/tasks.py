@@ -0,0 +1,7 @@
+from jobs.queue import task
+from .rollups import sync_order
+
+
+@task('analytics.sync_order')
+def sync_order_sales(order_id):
+    sync_order(order_id)
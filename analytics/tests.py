@@ -0,0 +1,166 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from jobs.models import Job
+from jobs.tests import run_worker
+from orders.models import CartItem, Order, OrderItem
+from store.models import Product
+from . import rollups
+from .models import DailyBrandSales, DailyProductSales, DailySales, RolledUpOrder
+
+
+@override_settings(JOB_SCHEDULE={})
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.snes = Product.objects.create(
+            name='SNES', brand='Nintendo', release_year=1990, price='199.99', platform='SNES',
+        )
+        self.n64 = Product.objects.create(
+            name='N64', brand='Nintendo', release_year=1996, price='149.99', platform='N64',
+        )
+        self.saturn = Product.objects.create(
+            name='Saturn', brand='Sega', release_year=1994, price='249.99', platform='Saturn',
+        )
+
+    def checkout(self, *lines):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ids = [CartItem.objects.create(user=self.user, product=p, quantity=q).id for p, q in lines]
+        response = client.post('/api/orders/', {'items': ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(pk=response.data['id'])
+
+    def make_order(self, day, *lines):
+        # Historic orders written directly, as before the rollups existed.
+        order = Order.objects.create(user=self.user, total_price=0)
+        Order.objects.filter(pk=order.pk).update(created_at=day)
+        Job.objects.filter(task='analytics.sync_order', payload={'order_id': order.pk}).delete()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=p, product_name=p.name, price=p.price, quantity=q)
+            for p, q in lines
+        ])
+        return order
+
+    def snapshot(self):
+        return {
+            model.__name__: sorted(
+                model.objects.values_list(*keys, 'orders', 'units', 'revenue')
+            )
+            for model, keys in (
+                (DailySales, ['day']),
+                (DailyProductSales, ['day', 'product_id']),
+                (DailyBrandSales, ['day', 'brand']),
+            )
+        }
+
+    def test_checkout_is_rolled_up_by_the_worker(self):
+        self.checkout((self.snes, 2), (self.n64, 1))
+        self.checkout((self.saturn, 1))
+        self.assertFalse(DailySales.objects.exists())
+
+        run_worker()
+        today = timezone.localdate()
+        day = DailySales.objects.get(day=today)
+        self.assertEqual((day.orders, day.units, day.revenue), (2, 4, Decimal('799.96')))
+        nintendo = DailyBrandSales.objects.get(day=today, brand='Nintendo')
+        self.assertEqual((nintendo.orders, nintendo.units, nintendo.revenue), (1, 3, Decimal('549.97')))
+        self.assertEqual(DailyProductSales.objects.get(day=today, product=self.snes).units, 2)
+
+    def test_status_changes_move_an_order_in_and_out(self):
+        order = self.checkout((self.snes, 1))
+        run_worker()
+        order.status = 'cancelled'
+        order.save()
+        run_worker()
+        self.assertFalse(DailySales.objects.exists())
+        self.assertFalse(DailyBrandSales.objects.exists())
+
+        order.status = 'shipped'
+        order.save()
+        run_worker()
+        self.assertEqual(DailySales.objects.get().revenue, Decimal('199.99'))
+
+    def test_sync_is_idempotent(self):
+        order = self.checkout((self.snes, 3))
+        run_worker()
+        rollups.sync_order(order.pk)
+        rollups.sync_order(order.pk)
+        self.assertEqual(DailyProductSales.objects.get().units, 3)
+
+    def test_backfill_matches_incremental_rollups(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        self.make_order(yesterday, (self.snes, 1), (self.saturn, 2))
+        self.make_order(yesterday, (self.n64, 4))
+        cancelled = self.make_order(yesterday, (self.snes, 5))
+        Order.objects.filter(pk=cancelled.pk).update(status='cancelled')
+        self.checkout((self.saturn, 1))
+        run_worker()
+
+        out = StringIO()
+        call_command('backfill_sales', '--chunk-size', '2', stdout=out)
+        self.assertIn('2 orders added, 0 removed', out.getvalue())
+        incremental = self.snapshot()
+        self.assertEqual(RolledUpOrder.objects.count(), 3)
+
+        call_command('backfill_sales', '--rebuild', stdout=StringIO())
+        self.assertEqual(self.snapshot(), incremental)
+        day = DailySales.objects.get(day=timezone.localdate(yesterday))
+        self.assertEqual((day.orders, day.units), (2, 7))
+
+    def test_rebuild_keeps_archived_orders(self):
+        long_ago = timezone.now() - timedelta(days=400)
+        self.make_order(long_ago, (self.snes, 1), (self.saturn, 2))
+        cancelled = self.make_order(long_ago, (self.n64, 3))
+        Order.objects.filter(pk=cancelled.pk).update(status='cancelled')
+        self.make_order(timezone.now() - timedelta(days=1), (self.n64, 4))
+        call_command('backfill_sales', stdout=StringIO())
+        before = self.snapshot()
+
+        call_command('archive_orders', stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 1)
+        out = StringIO()
+        call_command('backfill_sales', '--rebuild', '--chunk-size', '1', stdout=out)
+        self.assertIn('Up to archived order', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(RolledUpOrder.objects.count(), 2)
+
+    def test_sales_endpoint(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        self.make_order(yesterday, (self.snes, 1), (self.saturn, 2))
+        self.make_order(yesterday - timedelta(days=40), (self.n64, 1))
+        call_command('backfill_sales', stdout=StringIO())
+
+        client = APIClient()
+        self.assertEqual(client.get('/api/analytics/sales/').status_code, 401)
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/analytics/sales/').status_code, 403)
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@example.com', 'pass12345'))
+
+        # Default range is the last 30 days.
+        response = client.get('/api/analytics/sales/')
+        self.assertEqual(response.data['totals'], {'orders': 1, 'units': 3, 'revenue': Decimal('699.97')})
+        self.assertEqual([row['day'] for row in response.data['results']], [timezone.localdate(yesterday)])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/analytics/sales/', {
+                'group': 'brand', 'start': '2000-01-01', 'end': timezone.localdate().isoformat(),
+            })
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            [(row['brand'], row['units']) for row in response.data['results']],
+            [('Sega', 2), ('Nintendo', 2)],
+        )
+        response = client.get('/api/analytics/sales/', {'group': 'product', 'start': '2000-01-01', 'limit': 1})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Saturn'])
+
+        self.assertEqual(client.get('/api/analytics/sales/', {'start': '2030-01-02', 'end': '2030-01-01'}).status_code, 400)
+        self.assertEqual(client.get('/api/analytics/sales/', {'group': 'platform'}).status_code, 400)
@@ -0,0 +1,50 @@
+from django.db.models import F, Sum
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import DailyBrandSales, DailyProductSales, DailySales
+from .rollups import COUNTERS
+from .serializers import SalesQuerySerializer
+
+# Annotations can't reuse the field names, so grouped sums are renamed after.
+SUMS = {f'sum_{name}': Sum(name) for name in COUNTERS}
+
+
+def _renamed(row):
+    return {key.removeprefix('sum_'): value for key, value in row.items()}
+
+
+class SalesView(APIView):
+    """
+    Admin-only: revenue, units and orders for a date range, by day or as the
+    top products or brands. Answered from the rollup tables, whose size
+    depends on the range and the catalog, never on the number of orders.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = SalesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start, end, group = (params.validated_data[k] for k in ('start', 'end', 'group'))
+        in_range = {'day__gte': start, 'day__lte': end}
+
+        totals = DailySales.objects.filter(**in_range).aggregate(**SUMS)
+        if group == 'day':
+            results = DailySales.objects.filter(**in_range).order_by('day').values('day', *COUNTERS)
+        else:
+            if group == 'product':
+                rows = DailyProductSales.objects.values('product_id', name=F('product__name'))
+            else:
+                rows = DailyBrandSales.objects.values('brand')
+            results = [
+                _renamed(row) for row in rows.filter(**in_range).annotate(**SUMS)
+                .order_by('-sum_revenue')[:params.validated_data['limit']]
+            ]
+
+        return Response({
+            'start': start,
+            'end': end,
+            'group': group,
+            'totals': {name: value or 0 for name, value in _renamed(totals).items()},
+            'results': list(results),
+        })
@@ -0,0 +1,119 @@
+"""
+Native async GET handlers for DRF viewsets.
+
+DRF 3.14 only dispatches synchronously, so an ``async def`` handler needs
+its own dispatch. ``AsyncReadMixin`` wraps the viewset's ``as_view``: GET
+requests for the actions named in ``async_actions`` run ``a<action>()`` on
+the event loop, with queries, pagination, throttle counters and cache reads
+awaited through Django's async APIs. Every other method (and HEAD) goes to
+the ordinary sync view through ``sync_to_async``, so writes behave exactly
+as before. Under ASGI a slow client or an I/O wait then holds a coroutine
+rather than a whole worker; under WSGI (``runserver``, the test client)
+Django runs the async view in an event loop of its own.
+"""
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Serve GET for ``async_actions`` through ``a<action>`` coroutines."""
+    async_actions = ()
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if (actions or {}).get('get') not in cls.async_actions:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Keeps cls/actions/initkwargs for the router and schema generation,
+        # and csrf_exempt.
+        update_wrapper(async_view, view)
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``dispatch`` with an awaited handler; mirrors ``APIView.dispatch``."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        # JSON renders here; anything else (the browsable API may query for
+        # its forms) is rendered by Django in a thread.
+        if request.accepted_renderer.format == 'json' and hasattr(self.response, 'render'):
+            self.response.render()
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        # Session and basic authentication only have sync backends.
+        await sync_to_async(self.perform_authentication)(request)
+        self.check_permissions(request)
+        await self.acheck_throttles(request)
+
+    async def acheck_throttles(self, request):
+        durations = []
+        for throttle in self.get_throttles():
+            if hasattr(throttle, 'aallow_request'):
+                allowed = await throttle.aallow_request(request, self)
+            else:
+                allowed = await sync_to_async(throttle.allow_request)(request, self)
+            if not allowed:
+                durations.append(throttle.wait())
+        if durations:
+            self.throttled(request, max((d for d in durations if d is not None), default=None))
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
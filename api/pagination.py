@@ -0,0 +1,219 @@
+import base64
+import json
+import math
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination.
+
+    The page boundary is the (sort key, id) pair of the last row served, so
+    every page is a single indexed range scan with no COUNT and no OFFSET.
+    The sort key is the first ``order_by`` term already applied to the
+    queryset (e.g. by ``OrderingFilter``); ``id`` breaks ties in the same
+    direction.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the page is fetched with the async ORM."""
+        return self.set_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated page, one row longer than the page size to tell whether there is a next page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.key, self.descending = self.get_key(queryset)
+
+        ordering = [f'-{self.key}', '-id'] if self.descending else [self.key, 'id']
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.decode_cursor(request, queryset)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(*cursor))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, page):
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_key(self, queryset):
+        ordering = [o for o in queryset.query.order_by if isinstance(o, str)]
+        term = ordering[0] if ordering else self.default_ordering
+        key = term.lstrip('-')
+        if key == 'pk':
+            key = 'id'
+        return key, term.startswith('-')
+
+    def after(self, value, pk):
+        op = 'lt' if self.descending else 'gt'
+        if self.key == 'id':
+            return Q(**{f'id__{op}': pk})
+        return Q(**{f'{self.key}__{op}': value}) | Q(**{self.key: value, f'id__{op}': pk})
+
+    def decode_cursor(self, request, queryset):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            if payload['k'] != self.key:
+                raise ValueError
+            return self.parse_value(queryset, payload['v']), int(payload['id'])
+        except (ValueError, KeyError, TypeError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_value(self, queryset, value):
+        """
+        The cursor's sort key as the key's Python type (the cursor comes from
+        the client, so anything else must fail here, not in the query).
+        """
+        if self.key == 'id':
+            return None
+        if value is None or isinstance(value, (dict, list)):
+            raise ValueError
+        # Sort keys are model fields or annotations such as ``search_rank``.
+        annotation = queryset.query.annotations.get(self.key)
+        field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(self.key)
+        value = field.to_python(value)
+        if isinstance(value, (float, Decimal)) and not math.isfinite(value):
+            raise ValueError
+        return value
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.key)
+        # Decimals and datetimes travel as strings; the ORM parses them back
+        # when the cursor is applied as a filter.
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (int, float, str, bool)):
+            value = str(value)
+        payload = json.dumps({'k': self.key, 'v': value, 'id': obj.pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CountedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination that also reports a total supplied by the caller
+    (typically a denormalized counter), so no page ever runs COUNT(*).
+    """
+    count = None
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'nullable': True}
+        return response_schema
+
+
+class KeysetOptInPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to ``KeysetPagination`` when the
+    request carries a ``cursor`` parameter (empty for the first page).
+    """
+    keyset_class = KeysetPagination
+    keyset_ordering = '-id'
+
+    def use_keyset(self, request):
+        return self.keyset_class.cursor_query_param in request.query_params
+
+    def get_keyset(self, request):
+        if not self.use_keyset(request):
+            return None
+        keyset = self.keyset_class()
+        keyset.page_size = self.page_size or keyset.page_size
+        keyset.page_size_query_param = self.page_size_query_param or keyset.page_size_query_param
+        keyset.max_page_size = self.max_page_size or keyset.max_page_size
+        keyset.default_ordering = self.keyset_ordering
+        return keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.get_keyset(request)
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the COUNT and the page go through the async ORM."""
+        self.keyset = self.get_keyset(request)
+        if self.keyset is not None:
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached property: fill it in so page() doesn't
+        # run a blocking COUNT of its own.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
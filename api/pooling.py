@@ -0,0 +1,49 @@
+"""
+Database connection pool statistics.
+
+With ``OPTIONS['pool']`` set (see settings), each worker process keeps a
+psycopg 3 ``ConnectionPool`` per database alias and Django returns the
+connection to it at the end of every request rather than closing it.
+``pool_stats`` turns the pool's counters (cumulative since the pool opened)
+into the numbers worth watching: connections in use against ``max_size``,
+requests waiting, and how long checkouts waited.
+"""
+from django.db import connections
+
+
+def _alias_stats(connection):
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return {'pooled': False}
+    raw = pool.get_stats()
+    if pool.closed:
+        # Opened by this worker's first query; until then the sizes are nominal.
+        return {'pooled': True, 'open': False, 'min_size': raw.get('pool_min'), 'max_size': raw.get('pool_max')}
+    # Counters only appear once they have been incremented.
+    size, idle = raw.get('pool_size', 0), raw.get('pool_available', 0)
+    requests, waited = raw.get('requests_num', 0), raw.get('requests_queued', 0)
+    wait_ms, opened = raw.get('requests_wait_ms', 0), raw.get('connections_num', 0)
+    return {
+        'pooled': True,
+        'open': True,
+        'min_size': raw.get('pool_min'),
+        'max_size': raw.get('pool_max'),
+        'size': size,
+        'in_use': size - idle,
+        'idle': idle,
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': requests,
+        'requests_waited': waited,
+        'wait_ms': wait_ms,
+        'avg_wait_ms': round(wait_ms / requests, 2) if requests else 0.0,
+        'timeouts': raw.get('requests_errors', 0),
+        'connections_opened': opened,
+        'avg_connect_ms': round(raw.get('connections_ms', 0) / opened, 2) if opened else 0.0,
+        'connections_lost': raw.get('connections_lost', 0),
+        'bad_returns': raw.get('returns_bad', 0),
+    }
+
+
+def pool_stats():
+    """Pool use per database alias for this worker; ``{'pooled': False}`` where pooling is off."""
+    return {connection.alias: _alias_stats(connection) for connection in connections.all()}
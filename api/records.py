@@ -0,0 +1,77 @@
+"""
+Streaming record input for the bulk management commands
+(``import_catalog``, ``provision_users``).
+
+``read_rows`` yields ``(line number, record)`` from a CSV or JSONL stream
+without loading it; a JSONL line that isn't a JSON object comes through as
+a record carrying ``_error``. ``validate_batch`` runs a command's own
+``clean_row`` over the next slice of records, writes the ones it rejects
+(with their line and error) to the rejects file, and keys the clean ones
+so a later duplicate within the batch wins.
+"""
+import csv
+import json
+import sys
+
+
+class RowError(ValueError):
+    pass
+
+
+def text(model, field, value):
+    """``value`` as a stripped string that fits ``model.field``."""
+    value = '' if value is None else str(value).strip()
+    max_length = model._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        raise RowError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def source_format(source, fmt=None):
+    return fmt or ('jsonl' if source.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+
+def open_source(source):
+    return sys.stdin if source == '-' else open(source, newline='', encoding='utf-8')
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        for line_no, raw in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, raw
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            raw = {'_error': f'invalid JSON: {e}', '_line': line.rstrip('\n')}
+        if not isinstance(raw, dict):
+            raw = {'_error': 'record is not an object', '_line': line.rstrip('\n')}
+        yield line_no, raw
+
+
+def validate_batch(rows, clean_row, key, totals, rejects=None, redact=()):
+    """
+    Return the next batch of clean records keyed on ``key(row)``, or None at
+    EOF. Counts ``read`` and ``rejected`` in ``totals``; ``redact`` names
+    fields never written back out to the rejects file.
+    """
+    batch = {}
+    seen = False
+    for line_no, raw in rows:
+        seen = True
+        totals['read'] += 1
+        try:
+            if '_error' in raw:
+                raise RowError(raw['_error'])
+            row = clean_row(raw)
+        except RowError as e:
+            totals['rejected'] += 1
+            if rejects:
+                raw = {k: v for k, v in raw.items() if k not in redact}
+                rejects.write(json.dumps({'line': line_no, 'error': str(e), 'row': raw}) + '\n')
+            continue
+        batch[key(row)] = row
+    return batch if seen else None
@@ -1,3 +1,145 @@
+from unittest import mock
+
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
 from django.test import TestCase
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from orders.models import CartItem, Order
+from store.models import Product
+from users.authentication import principals
+from .pooling import pool_stats
+
+
+def rates(**overrides):
+    return {
+        'NUM_PROXIES': api_settings.NUM_PROXIES,
+        'DEFAULT_THROTTLE_RATES': {**api_settings.DEFAULT_THROTTLE_RATES, **overrides},
+    }
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create_user(username='player1', password='pass12345!x')
+        Product.objects.create(name='SNES', brand='Nintendo', release_year=1990, price='199.99', platform='SNES')
+
+    def test_username_budget_stops_password_hashing(self):
+        check = mock.patch.object(AbstractBaseUser, 'check_password', autospec=True, return_value=False)
+        with check as check_password:
+            statuses = [
+                self.client.post('/api/auth/token/', {'username': 'player1', 'password': 'guess'}).status_code
+                for _ in range(8)
+            ]
+        self.assertEqual(statuses, [401] * 5 + [429] * 3)
+        self.assertEqual(check_password.call_count, 5)
+
+        # The other endpoints spend the same budget, without touching the database.
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/login/', {'username': 'PLAYER1', 'password': 'guess'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_ip_budget_covers_every_username(self):
+        statuses = [
+            self.client.post('/api/login/', {'username': f'user{i}', 'password': 'guess'}).status_code
+            for i in range(21)
+        ]
+        self.assertEqual(statuses[-2:], [401, 429])
+        # Another client is unaffected.
+        other = APIClient(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.post('/api/login/', {'username': 'user99', 'password': 'guess'}).status_code, 401)
+
+    def test_login_flood_leaves_catalog_reads_alone(self):
+        for i in range(50):
+            self.client.post('/api/register/', {'username': f'bot{i}', 'password': 'x'})
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+    def test_anonymous_catalog_reads_have_their_own_budget(self):
+        with self.settings(REST_FRAMEWORK=rates(catalog_anon='3/min')):
+            statuses = [self.client.get('/api/products/').status_code for _ in range(4)]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+
+            self.client.force_authenticate(User.objects.get())
+            self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+    def test_forged_forwarded_for_does_not_reset_the_ip_budget(self):
+        # The proxy appends the real client address; anything before it is the client's.
+        def forwarded(i):
+            return {'HTTP_X_FORWARDED_FOR': f'198.51.100.{i}, 203.0.113.7'}
+
+        statuses = [
+            self.client.post('/api/login/', {'username': f'user{i}', 'password': 'guess'}, **forwarded(i)).status_code
+            for i in range(21)
+        ]
+        self.assertEqual(statuses[-2:], [401, 429])
+        with self.settings(REST_FRAMEWORK=rates(catalog_anon='3/min')):
+            statuses = [self.client.get('/api/products/', **forwarded(i)).status_code for i in range(4)]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+
+
+class SessionBootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        principals.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', email='p1@example.com', password='pass12345!x')
+        snes = Product.objects.create(name='SNES', brand='Nintendo', release_year=1990, price='199.99', platform='SNES')
+        n64 = Product.objects.create(name='N64', brand='Nintendo', release_year=1996, price='149.99', platform='N64')
+        CartItem.objects.create(user=self.user, product=snes, quantity=2)
+        CartItem.objects.create(user=self.user, product=n64, quantity=1)
+        for total in ('10.00', '20.00', '30.00'):
+            Order.objects.create(user=self.user, total_price=total)
+        access = self.client.post('/api/auth/token/', {'username': 'player1', 'password': 'pass12345!x'}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_one_request_in_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/session/', {'orders': 2})
+        self.assertEqual(response.data['user'], {
+            'id': self.user.id, 'username': 'player1', 'email': 'p1@example.com', 'role': 'user',
+        })
+        self.assertEqual(response.data['cart'], {'count': 2, 'quantity': 3, 'total': '549.97'})
+        self.assertEqual([o['total_price'] for o in response.data['orders']], ['30.00', '20.00'])
+
+        # With the user cached, just the cart and the orders.
+        with self.assertNumQueries(2):
+            self.client.get('/api/session/')
+
+    def test_empty_session_and_auth_required(self):
+        CartItem.objects.all().delete()
+        response = self.client.get('/api/session/', {'orders': 0})
+        self.assertEqual(response.data['cart'], {'count': 0, 'quantity': 0, 'total': '0.00'})
+        self.assertEqual(response.data['orders'], [])
+        self.assertEqual(self.client.get('/api/session/', {'orders': 50}).status_code, 400)
+        self.assertEqual(APIClient().get('/api/session/').status_code, 401)
+
+
+class DatabasePoolStatsTests(TestCase):
+    def pool(self, closed=False, **stats):
+        pool = mock.Mock(closed=closed)
+        pool.get_stats.return_value = stats
+        return mock.patch.object(type(connections['default']), 'pool', new_callable=mock.PropertyMock, create=True, return_value=pool)
+
+    def test_counters_become_use_and_wait_times(self):
+        with self.pool(pool_min=2, pool_max=10, pool_size=4, pool_available=1, requests_waiting=3,
+                       requests_num=200, requests_queued=8, requests_wait_ms=500,
+                       connections_num=4, connections_ms=120):
+            stats = pool_stats()['default']
+        self.assertEqual((stats['size'], stats['in_use'], stats['idle'], stats['waiting']), (4, 3, 1, 3))
+        self.assertEqual((stats['requests_waited'], stats['avg_wait_ms']), (8, 2.5))
+        self.assertEqual((stats['connections_opened'], stats['avg_connect_ms']), (4, 30.0))
+        self.assertEqual(stats['timeouts'], 0)
+
+        with self.pool(closed=True, pool_min=2, pool_max=10, pool_size=2):
+            self.assertEqual(pool_stats()['default'], {'pooled': True, 'open': False, 'min_size': 2, 'max_size': 10})
 
-# Create your tests here.
+    def test_endpoint_is_admin_only(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/db/pool-stats/').status_code, 401)
+        client.force_authenticate(User.objects.create_superuser(username='admin', password='pass12345!x'))
+        # SQLite in tests: no pool.
+        self.assertEqual(client.get('/api/db/pool-stats/').data, {'default': {'pooled': False}})
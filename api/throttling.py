@@ -0,0 +1,124 @@
+"""
+Request throttles backed by the Django cache.
+
+Unlike DRF's ``SimpleRateThrottle``, which reads, appends to and rewrites
+a list of timestamps per client, each check here is a constant number of
+cache operations: an atomic ``incr`` of the counter for the current window
+plus a read of the previous window's counter. The two are blended into a
+sliding-window estimate, which refills steadily like a token bucket
+without needing a compare-and-set the cache API doesn't offer. Nothing
+touches the database, so a throttled request costs no more than a cache
+round trip and never reaches the view (or its password hashing).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def get_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+
+class CacheRateThrottle(SimpleRateThrottle):
+    """Sliding-window counter throttle; subclasses set ``scope`` and ``get_cache_key``."""
+
+    def get_rate(self):
+        # Read the rates at request time so settings overrides apply.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cache = get_cache()
+        now = time.time()
+        current_key, previous_key = self.window_keys(now)
+        cache.add(current_key, 0, timeout=self.duration * 2)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add and incr: start the window over.
+            cache.set(current_key, 1, timeout=self.duration * 2)
+            count = 1
+        return self.decide(now, count, cache.get(previous_key, 0))
+
+    async def aallow_request(self, request, view):
+        """``allow_request`` for async views, through the cache's async API."""
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cache = get_cache()
+        now = time.time()
+        current_key, previous_key = self.window_keys(now)
+        await cache.aadd(current_key, 0, timeout=self.duration * 2)
+        try:
+            count = await cache.aincr(current_key)
+        except ValueError:
+            await cache.aset(current_key, 1, timeout=self.duration * 2)
+            count = 1
+        return self.decide(now, count, await cache.aget(previous_key, 0))
+
+    def window_keys(self, now):
+        window = int(now // self.duration)
+        return (
+            f'throttle:{self.scope}:{self.key}:{window}',
+            f'throttle:{self.scope}:{self.key}:{window - 1}',
+        )
+
+    def decide(self, now, count, previous):
+        elapsed = (now % self.duration) / self.duration
+        estimate = previous * (1 - elapsed) + count
+        if estimate <= self.num_requests:
+            return True
+        # Until enough of the previous window has slid out, or the next window.
+        if previous:
+            self.wait_seconds = min(
+                (estimate - self.num_requests) / previous * self.duration,
+                self.duration - now % self.duration,
+            )
+        else:
+            self.wait_seconds = self.duration - now % self.duration
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class AuthIPThrottle(CacheRateThrottle):
+    """Login, registration and token requests per client IP."""
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AuthUsernameThrottle(CacheRateThrottle):
+    """Login, registration and token requests per username, whatever IPs they come from."""
+    scope = 'auth_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username or not isinstance(username, str):
+            return None
+        # Hashed: usernames may hold characters cache keys can't.
+        return hashlib.sha256(username.strip().lower().encode('utf-8')).hexdigest()[:32]
+
+
+class CatalogAnonThrottle(CacheRateThrottle):
+    """Anonymous catalog reads per client IP; signed-in customers are not limited."""
+    scope = 'catalog_anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
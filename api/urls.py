@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from store.views import ProductViewSet, RatingViewSet, CommentViewSet
 from orders.views import CartItemViewSet, OrderViewSet
-from users.views import UserViewSet, ProfileViewSet, RegistrationView, LoginView, LogoutView
+from jobs.views import JobStatsView
+from analytics.views import SalesView
+from users.views import UserViewSet, ProfileViewSet, RegistrationView, LoginView, LogoutView, ThrottledTokenObtainPairView
+from .views import DatabasePoolStatsView, SessionBootstrapView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
@@ -23,10 +25,14 @@ urlpatterns = [
     path('register/', RegistrationView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('session/', SessionBootstrapView.as_view(), name='session_bootstrap'),
+    path('jobs/stats/', JobStatsView.as_view(), name='job_stats'),
+    path('analytics/sales/', SalesView.as_view(), name='analytics_sales'),
+    path('db/pool-stats/', DatabasePoolStatsView.as_view(), name='db_pool_stats'),
     path('', include(router.urls)),
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('auth/token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
 ] 
\ No newline at end of file
@@ -1,3 +1,63 @@
-from django.shortcuts import render
+from decimal import Decimal
 
-# Create your views here.
+from django.db.models import Count, F, Sum
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from orders.models import CartItem, Order, money
+from orders.serializers import OrderSummarySerializer
+from .pooling import pool_stats
+
+
+class SessionBootstrapQuerySerializer(serializers.Serializer):
+    orders = serializers.IntegerField(min_value=0, max_value=20, default=5)
+
+
+class SessionBootstrapView(APIView):
+    """
+    Everything a page needs about the signed-in customer in one request:
+    the user and their role, cart totals and the latest orders. A fixed
+    number of queries, at most one for the user (none when the JWT user
+    cache has them), one for the cart and one for the orders.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = SessionBootstrapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        user = request.user
+        profile = getattr(user, 'profile', None)
+
+        cart = CartItem.objects.filter(user=user).aggregate(
+            lines=Count('id'),
+            units=Sum('quantity'),
+            amount=Sum(F('quantity') * F('product__price'), output_field=money()),
+        )
+        limit = params.validated_data['orders']
+        orders = (
+            Order.objects.filter(user=user).with_item_count().order_by('-created_at', '-id')[:limit]
+            if limit else []
+        )
+
+        return Response({
+            'user': {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'role': profile.role if profile is not None else 'user',
+            },
+            'cart': {
+                'count': cart['lines'],
+                'quantity': cart['units'] or 0,
+                'total': str((cart['amount'] or Decimal('0')).quantize(Decimal('0.01'))),
+            },
+            'orders': OrderSummarySerializer(orders, many=True).data,
+        })
+
+
+class DatabasePoolStatsView(APIView):
+    """Admin-only: database connection pool use and wait times for this worker"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(pool_stats())
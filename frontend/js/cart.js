@@ -108,14 +108,14 @@ function fetchCart() {
     }
 
     console.log('Fetching cart...');
-    makeAuthenticatedRequest(`${CONFIG.API_BASE_URL}/cart/`)
+    makeAuthenticatedRequest(`${CONFIG.API_BASE_URL}/cart/summary/`)
     .then(res => res.json())
     .then(data => {
         console.log('Cart data received:', data);
-        const items = Array.isArray(data) ? data : (data.results || []);
+        const items = data.items || [];
         console.log('Cart items array:', items);
         console.log('Cart items length:', items.length);
-        renderCart(items);
+        renderCart(items, data.total);
     })
     .catch(error => {
         console.error('Error fetching cart:', error);
@@ -125,10 +125,9 @@ function fetchCart() {
     });
 }
 
-function renderCart(items) {
+function renderCart(items, total = '0.00') {
     console.log('Rendering cart with items:', items);
     cartTable.innerHTML = '';
-    let total = 0;
     const checkoutBtn = document.getElementById('checkout-btn');
     
     if (!items.length) {
@@ -158,8 +157,6 @@ function renderCart(items) {
     items.forEach((item, index) => {
         console.log(`Processing item ${index}:`, item);
         console.log('Item product:', item.product);
-        const itemTotal = item.product.price * item.quantity;
-        total += itemTotal;
         
         const row = document.createElement('tr');
         row.setAttribute('data-qa', 'cart-row');
@@ -167,13 +164,13 @@ function renderCart(items) {
             <td>${item.product.name}</td>
             <td>$${item.product.price}</td>
             <td><input type="number" min="1" value="${item.quantity}" data-id="${item.id}" class="form-control form-control-sm cart-qty" data-qa="cart-qty"></td>
-            <td data-qa="cart-item-total">$${itemTotal.toFixed(2)}</td>
+            <td data-qa="cart-item-total">$${item.line_total}</td>
             <td><button class="btn btn-sm btn-danger cart-remove" data-id="${item.id}" data-qa="cart-remove">&times;</button></td>
         `;
         cartTable.appendChild(row);
     });
     
-    cartTotal.textContent = total.toFixed(2);
+    cartTotal.textContent = total;
     console.log('Cart rendering complete, total:', total);
     
     // Add event listeners for quantity changes and remove buttons
@@ -195,6 +192,16 @@ function renderCart(items) {
     });
 }
 
+// Send cart changes as one batch; the response is the updated cart summary
+function applyCartOperations(operations) {
+    return makeAuthenticatedRequest(`${CONFIG.API_BASE_URL}/cart/batch/`, {
+        method: 'POST',
+        body: JSON.stringify({ operations })
+    })
+    .then(res => res.json())
+    .then(data => renderCart(data.items || [], data.total));
+}
+
 function updateCartItem(id, quantity) {
     const token = getToken();
     if (!token) {
@@ -203,16 +210,7 @@ function updateCartItem(id, quantity) {
         return;
     }
 
-    makeAuthenticatedRequest(`${CONFIG.API_BASE_URL}/cart/${id}/`, {
-        method: 'PATCH',
-        body: JSON.stringify({ quantity })
-    })
-    .then(res => {
-        if (!res.ok) {
-            throw new Error('Failed to update cart item');
-        }
-        return fetchCart();
-    })
+    applyCartOperations([{ op: 'set', id: Number(id), quantity: Number(quantity) }])
     .catch(error => {
         console.error('Error updating cart item:', error);
         alert('Failed to update cart item. Please try again.');
@@ -227,15 +225,7 @@ function removeCartItem(id) {
         return;
     }
 
-    makeAuthenticatedRequest(`${CONFIG.API_BASE_URL}/cart/${id}/`, {
-        method: 'DELETE'
-    })
-    .then(res => {
-        if (!res.ok) {
-            throw new Error('Failed to remove cart item');
-        }
-        return fetchCart();
-    })
+    applyCartOperations([{ op: 'remove', id: Number(id) }])
     .catch(error => {
         console.error('Error removing cart item:', error);
         alert('Failed to remove cart item. Please try again.');
@@ -19,7 +19,7 @@ document.addEventListener('DOMContentLoaded', async function() {
 
     try {
         console.log('Fetching cart from API...');
-        const cartRes = await fetch('/api/cart/', {
+        const cartRes = await fetch('/api/cart/summary/', {
             headers: { 'Authorization': 'Bearer ' + token }
         });
         console.log('Cart response status:', cartRes.status);
@@ -31,7 +31,7 @@ document.addEventListener('DOMContentLoaded', async function() {
         const cartData = await cartRes.json();
         console.log('Cart data received:', cartData);
         
-        const cartItems = Array.isArray(cartData) ? cartData : (cartData.results || []);
+        const cartItems = cartData.items;
         console.log('Cart items array:', cartItems);
         console.log('Cart items length:', cartItems.length);
         
@@ -42,9 +42,20 @@ document.addEventListener('DOMContentLoaded', async function() {
             return;
         }
         
+        // Hold limited-run stock while the order form is filled in
+        const reserveRes = await fetch('/api/cart/reserve/', {
+            method: 'POST',
+            headers: { 'Authorization': 'Bearer ' + token }
+        });
+        if (reserveRes.status === 409) {
+            alert('Some items in your cart just sold out. Please update your cart.');
+            window.location.href = '/cart/';
+            return;
+        }
+
         console.log('Cart has items, displaying summary');
         // Display cart summary
-        const total = cartItems.reduce((sum, item) => sum + (item.product.price * item.quantity), 0);
+        const total = parseFloat(cartData.total);
         const cartSummary = document.createElement('div');
         cartSummary.className = 'alert alert-info mb-3';
         cartSummary.innerHTML = `
@@ -70,6 +81,9 @@ if (Math.random() < 0.25) {
     }, 5000);
 }
 
+// One key per order attempt: a double submit or network retry can't place two orders
+let orderIdempotencyKey = newIdempotencyKey();
+
 document.getElementById('checkout-form').addEventListener('submit', async function(e) {
     e.preventDefault();
     const name = document.getElementById('name').value.trim();
@@ -114,7 +128,7 @@ document.getElementById('checkout-form').addEventListener('submit', async functi
     let cartItems = [];
     let totalPrice = 0;
     try {
-        const cartRes = await fetch('/api/cart/', {
+        const cartRes = await fetch('/api/cart/summary/', {
             headers: { 'Authorization': 'Bearer ' + token }
         });
         
@@ -123,7 +137,7 @@ document.getElementById('checkout-form').addEventListener('submit', async functi
         }
         
         const cartData = await cartRes.json();
-        cartItems = Array.isArray(cartData) ? cartData : (cartData.results || []);
+        cartItems = cartData.items;
         
         if (!cartItems.length) {
             errorDiv.textContent = 'Your cart is empty. Please add items before checkout.';
@@ -132,8 +146,8 @@ document.getElementById('checkout-form').addEventListener('submit', async functi
             return;
         }
         
-        // Calculate total price
-        totalPrice = cartItems.reduce((sum, item) => sum + (item.product.price * item.quantity), 0);
+        // Total is computed by the server
+        totalPrice = parseFloat(cartData.total);
         
     } catch (error) {
         console.error('Error fetching cart:', error);
@@ -149,7 +163,8 @@ document.getElementById('checkout-form').addEventListener('submit', async functi
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'Authorization': 'Bearer ' + token
+                'Authorization': 'Bearer ' + token,
+                'Idempotency-Key': orderIdempotencyKey
             },
             body: JSON.stringify({
                 items: cartItems.map(item => item.id),
@@ -171,6 +186,8 @@ document.getElementById('checkout-form').addEventListener('submit', async functi
             window.location.href = '/profile/';
         } else {
             const data = await orderRes.json();
+            // A rejected order may be corrected and resubmitted as a new request.
+            orderIdempotencyKey = newIdempotencyKey();
             errorDiv.textContent = data.error || data.detail || 'Order failed.';
         }
     } catch (error) {
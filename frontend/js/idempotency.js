@@ -0,0 +1,9 @@
+// Idempotency-Key values for POSTs that must not be applied twice
+// (orders/idempotency.py). Retries of the same action reuse the key so the
+// server applies it once; a fresh action gets a fresh key.
+function newIdempotencyKey() {
+    return window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Make it globally available
+window.newIdempotencyKey = newIdempotencyKey;
@@ -23,7 +23,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 col.className = 'col-md-4 mb-4';
                 col.innerHTML = `
                     <div class="card card-retro h-100">
-                        <img src="${product.image}" class="card-img-top" alt="${product.name}" style="height:200px;object-fit:contain;background:#222;">
+                        <img src="${product.thumbnail || product.image}" ${product.srcset ? `srcset="${product.srcset}" sizes="(max-width: 768px) 100vw, 33vw"` : ''} loading="lazy" class="card-img-top" alt="${product.name}" style="height:200px;object-fit:contain;background:#222;">
                         <div class="card-body">
                             <h5 class="card-title">${product.name}</h5>
                             <p class="card-text">${product.brand} (${product.release_year})</p>
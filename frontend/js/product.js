@@ -55,6 +55,10 @@ function displayProduct(product) {
     addToCartBtn.addEventListener('click', () => addToCart(product.id));
 }
 
+// Kept until the server answers, so retrying an add whose response was lost
+// replays it instead of adding the item twice.
+let pendingCartAddKey = null;
+
 // Add to cart functionality
 function addToCart(productId) {
     const token = localStorage.getItem('token');
@@ -63,19 +67,24 @@ function addToCart(productId) {
         window.location.href = '/login/';
         return;
     }
+    pendingCartAddKey = pendingCartAddKey || newIdempotencyKey();
 
     fetch('/api/cart/', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`
+            'Authorization': `Bearer ${token}`,
+            'Idempotency-Key': pendingCartAddKey
         },
         body: JSON.stringify({
             product: productId,
             quantity: 1
         })
     })
-    .then(response => response.json())
+    .then(response => {
+        pendingCartAddKey = null;
+        return response.json();
+    })
     .then(data => {
         console.log('Added to cart:', data);
         addToCartBtn.textContent = 'Added to Cart!';
@@ -95,7 +104,9 @@ function addToCart(productId) {
 function fetchComments() {
     fetch(`/api/products/${productId}/comments/`)
         .then(response => response.json())
-        .then(comments => {
+        .then(data => {
+            // Comments are paginated: newest page first, `data.next` for older ones.
+            const comments = Array.isArray(data) ? data : (data.results || []);
             console.log('Comments:', comments);
             displayComments(comments);
         })
@@ -5,11 +5,25 @@ const searchInput = document.getElementById('search-input');
 const sortSelect = document.getElementById('sort-select');
 const pagination = document.getElementById('pagination');
 
-let currentPage = 1;
+let nextUrl = null;
+let loading = false;
+let generation = 0;
 
-function fetchProducts(page = 1, search = '', ordering = '-release_year') {
-    let url = `${apiUrl}?page=${page}&ordering=${ordering}`;
+// Keyset mode (?cursor=) returns a `next` link instead of page numbers, so
+// each batch is a single indexed range scan no matter how far the user scrolls.
+function fetchProducts(search = '', ordering = '-release_year') {
+    let url = `${apiUrl}?cursor=&ordering=${ordering}`;
     if (search) url += `&search=${encodeURIComponent(search)}`;
+    productList.innerHTML = '';
+    generation++;
+    loading = false;
+    loadProducts(url);
+}
+
+function loadProducts(url) {
+    if (!url || loading) return;
+    const requestGeneration = generation;
+    loading = true;
     console.log('Fetching products from:', url);
     fetch(url)
         .then(res => {
@@ -20,27 +34,34 @@ function fetchProducts(page = 1, search = '', ordering = '-release_year') {
             return res.json();
         })
         .then(data => {
-            console.log('Products data:', data);
+            // Drop responses for a search or sort that has since been replaced.
+            if (requestGeneration !== generation) return;
             let products = Array.isArray(data) ? data : (data.results || []);
             console.log('Number of products:', products.length);
             renderProducts(products);
-            renderPagination(data, page);
+            if (!productList.children.length && !data.next) {
+                productList.innerHTML = '<div class="col-12 text-center"><p>No products found.</p></div>';
+            }
+            nextUrl = data.next || null;
         })
         .catch(error => {
             console.error('Error fetching products:', error);
             productList.innerHTML = '<div class="col-12 text-center"><p class="text-danger">Error loading products. Please check the console for details.</p></div>';
+            nextUrl = null;
+        })
+        .finally(() => {
+            if (requestGeneration === generation) loading = false;
         });
 }
 
 function renderProducts(products) {
-    productList.innerHTML = '';
     products.forEach(product => {
         const col = document.createElement('div');
         col.className = 'col-md-4 mb-4';
         col.setAttribute('data-qa', 'product-card');
         col.innerHTML = `
             <div class="card card-retro h-100">
-                <img src="${product.image}" class="card-img-top" alt="${product.name}" style="height:200px;object-fit:contain;background:#222;">
+                <img src="${product.thumbnail || product.image}" ${product.srcset ? `srcset="${product.srcset}" sizes="(max-width: 768px) 100vw, 33vw"` : ''} loading="lazy" class="card-img-top" alt="${product.name}" style="height:200px;object-fit:contain;background:#222;">
                 <div class="card-body">
                     <h5 class="card-title">${product.name}</h5>
                     <p class="card-text">${product.brand} (${product.release_year})</p>
@@ -54,44 +75,12 @@ function renderProducts(products) {
     });
 }
 
-function renderPagination(data, page) {
-    pagination.innerHTML = '';
-    
-    // Check if we have pagination data
-    if (data && data.count && data.results) {
-        const totalPages = Math.ceil(data.count / 10); // Assuming page size is 10
-        if (totalPages <= 1) return;
-        
-        let html = '<ul class="pagination justify-content-center">';
-        
-        // Previous button
-        if (page > 1) {
-            html += `<li class="page-item"><a class="page-link" href="#" data-page="${page - 1}">Previous</a></li>`;
-        }
-        
-        // Page numbers
-        for (let i = 1; i <= totalPages; i++) {
-            html += `<li class="page-item${i === page ? ' active' : ''}"><a class="page-link" href="#" data-page="${i}">${i}</a></li>`;
-        }
-        
-        // Next button
-        if (page < totalPages) {
-            html += `<li class="page-item"><a class="page-link" href="#" data-page="${page + 1}">Next</a></li>`;
-        }
-        
-        html += '</ul>';
-        pagination.innerHTML = html;
-        
-        // Add event listeners to pagination links
-        document.querySelectorAll('#pagination .page-link').forEach(link => {
-            link.addEventListener('click', e => {
-                e.preventDefault();
-                currentPage = parseInt(link.dataset.page);
-                fetchProducts(currentPage, searchInput.value, sortSelect.value);
-            });
-        });
+// The pagination nav doubles as the infinite-scroll sentinel.
+const scrollObserver = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) {
+        loadProducts(nextUrl);
     }
-}
+}, { rootMargin: '400px' });
 
 searchForm.setAttribute('data-qa', 'search-form');
 searchInput.setAttribute('data-qa', 'search-input');
@@ -99,12 +88,13 @@ sortSelect.setAttribute('data-qa', 'sort-select');
 
 searchForm.addEventListener('submit', function(e) {
     e.preventDefault();
-    fetchProducts(1, searchInput.value, sortSelect.value);
+    fetchProducts(searchInput.value, sortSelect.value);
 });
 sortSelect.addEventListener('change', function() {
-    fetchProducts(1, searchInput.value, sortSelect.value);
+    fetchProducts(searchInput.value, sortSelect.value);
 });
 
 document.addEventListener('DOMContentLoaded', function() {
+    scrollObserver.observe(pagination);
     fetchProducts();
 }); 
\ No newline at end of file
@@ -77,6 +77,11 @@ if (profileForm) {
             .then(res => res.json())
             .then(data => {
                 if (!data.error) {
+                    // Older tokens were revoked by the change; keep this session signed in.
+                    if (data.access) {
+                        localStorage.setItem('token', data.access);
+                        localStorage.setItem('refresh', data.refresh);
+                    }
                     errorDiv.textContent = 'Password updated!';
                 } else {
                     errorDiv.textContent = data.error || 'Password update failed.';
@@ -87,40 +92,24 @@ if (profileForm) {
 }
 
 document.addEventListener('DOMContentLoaded', function() {
-    // Fetch user info
-    fetch('/api/users/', {
+    // One bootstrap request brings the user, their role and the latest orders.
+    fetch('/api/session/?orders=10', {
         headers: { 'Authorization': 'Bearer ' + getToken() }
     })
     .then(res => res.json())
-    .then(users => {
-        // Find current user by decoding JWT or by matching with /api/profiles/
-        fetch('/api/profiles/', {
-            headers: { 'Authorization': 'Bearer ' + getToken() }
-        })
-        .then(res => res.json())
-        .then(profiles => {
-            const userId = parseJwt(getToken()).user_id;
-            const user = users.find(u => u.id === userId);
-            const profile = (profiles.results || profiles).find(p => p.user.id === userId);
-            if (user) {
-                document.getElementById('profile-info').innerHTML = `
-                    <div class='card card-retro p-3 mb-3'>
-                        <strong>Username:</strong> ${user.username}<br>
-                        <strong>Email:</strong> ${user.email}<br>
-                        <strong>Role:</strong> ${profile ? profile.role : 'User'}
-                    </div>
-                `;
-            }
-        });
-    });
+    .then(session => {
+        const user = session.user;
+        if (user) {
+            document.getElementById('profile-info').innerHTML = `
+                <div class='card card-retro p-3 mb-3'>
+                    <strong>Username:</strong> ${user.username}<br>
+                    <strong>Email:</strong> ${user.email}<br>
+                    <strong>Role:</strong> ${user.role || 'User'}
+                </div>
+            `;
+        }
 
-    // Fetch order history
-    fetch('/api/orders/', {
-        headers: { 'Authorization': 'Bearer ' + getToken() }
-    })
-    .then(res => res.json())
-    .then(data => {
-        let orders = data.results || data;
+        let orders = session.orders || [];
         // Buggy behavior: sometimes show empty order history even if orders exist
         if (orders.length && Math.random() < 0.2) {
             orders = [];
@@ -0,0 +1,18 @@
+"""
+Gunicorn settings, read from the working directory at startup.
+
+The web process serves ``retrostore.wsgi`` on sync workers. Setting
+``WEB_INTERFACE=asgi`` serves ``retrostore.asgi`` on uvicorn workers
+instead: it holds up when many clients are slow or keep connections open,
+but measured slower for ordinary fast clients, so it is opt-in.
+"""
+import os
+
+interface = os.environ.get('WEB_INTERFACE', 'wsgi')
+if interface == 'asgi':
+    wsgi_app = 'retrostore.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif interface == 'wsgi':
+    wsgi_app = 'retrostore.wsgi:application'
+else:
+    raise ValueError(f"WEB_INTERFACE must be 'wsgi' or 'asgi', not {interface!r}")
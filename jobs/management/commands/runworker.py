@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection
+from jobs import queue
+
+HOUSEKEEPING_INTERVAL = 30
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Jobs run in parallel (one thread and DB connection each)')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Run every ready job, then exit (for cron or tests)')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and latency, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in queue.stats().items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        self.stop = threading.Event()
+        self.once = options['once']
+        self.poll = options['poll']
+        self.counts = {'done': 0, 'failed': 0}
+        self.lock = threading.Lock()
+        name = f'{socket.gethostname()}:{os.getpid()}'
+
+        queue.requeue_stale()
+        queue.schedule_periodic()
+        if self.once and concurrency == 1:
+            # Drain in this thread, on this connection.
+            self.work(name)
+        else:
+            self.run_threads(name, concurrency)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {name} stopped: {self.counts['done']} done, {self.counts['failed']} failed"
+        ))
+
+    def run_threads(self, name, concurrency):
+        threads = [
+            threading.Thread(target=self.work_in_thread, args=(f'{name}:{i}',), daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'Worker {name} running {concurrency} job(s) at a time')
+
+        last_housekeeping = time.monotonic()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(min(self.poll, 1))
+                if not self.once and time.monotonic() - last_housekeeping >= HOUSEKEEPING_INTERVAL:
+                    # Recover jobs of dead workers and queue the next periodic runs.
+                    close_old_connections()
+                    queue.requeue_stale()
+                    queue.schedule_periodic()
+                    last_housekeeping = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the running jobs finish...')
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work_in_thread(self, name):
+        try:
+            self.work(name, thread=True)
+        finally:
+            connection.close()
+
+    def work(self, name, thread=False):
+        while not self.stop.is_set():
+            if thread:
+                close_old_connections()
+            try:
+                jobs = queue.claim(name)
+            except DatabaseError as e:
+                # Lock timeouts and dropped connections: back off and retry.
+                self.stderr.write(self.style.WARNING(f'{name} could not claim jobs: {e}'))
+                self.stop.wait(self.poll)
+                continue
+            if not jobs:
+                if self.once:
+                    return
+                self.stop.wait(self.poll)
+                continue
+            for job in jobs:
+                ok = queue.run(job)
+                with self.lock:
+                    self.counts['done' if ok else 'failed'] += 1
+                if not ok:
+                    self.stderr.write(self.style.WARNING(f'{job} failed (attempt {job.attempts})'))
@@ -0,0 +1,174 @@
+"""
+A small job queue stored in the application database.
+
+Jobs are rows in ``jobs_job``. ``enqueue`` inside a transaction commits the
+job together with the write that caused it, so a worker never sees a job
+for data that was rolled back. Workers (``manage.py runworker``) claim
+ready jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it, and with a conditional ``UPDATE ... WHERE status = 'queued'``
+per job elsewhere (SQLite, which serializes writers anyway). Failed jobs
+are retried with exponential backoff until ``max_attempts``.
+"""
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from .models import Job
+
+registry = {}
+
+
+def task(name):
+    """Register a function as the job handler for ``name``; it gets the payload as kwargs."""
+    def register(func):
+        registry[name] = func
+        func.task_name = name
+        return func
+    return register
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(name, payload=None, delay=0, key=None, max_attempts=None):
+    """
+    Queue ``name`` to run with ``payload`` after ``delay`` seconds.
+
+    With a ``key``, a job that is already queued under the same key absorbs
+    this one and is returned instead. The key only dedups until the job
+    first runs; retries are queued without it.
+    """
+    job = Job(
+        task=name,
+        payload=payload or {},
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or _setting('JOB_MAX_ATTEMPTS', 5),
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        return Job.objects.filter(key=key, status=Job.QUEUED).first()
+
+
+def claim(worker, limit=1):
+    """Mark up to ``limit`` ready jobs as running for ``worker`` and return them."""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    running = {'status': Job.RUNNING, 'started_at': now, 'worker': worker, 'attempts': F('attempts') + 1}
+
+    if connections[Job.objects.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(**running)
+    else:
+        jobs = [
+            job for job in ready[:limit]
+            if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(**running)
+        ]
+
+    for job in jobs:
+        job.status, job.started_at, job.worker = Job.RUNNING, now, worker
+        job.attempts += 1
+    return jobs
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``: exponential, capped, with jitter."""
+    base = _setting('JOB_BACKOFF_BASE', 5)
+    delay = min(base * 2 ** (attempts - 1), _setting('JOB_BACKOFF_MAX', 3600))
+    return delay * random.uniform(1, 1.1)
+
+
+def run(job):
+    """Run one claimed job and record its outcome. Returns True on success."""
+    func = registry.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as {job.task!r}')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if func is not None and job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, key=None, last_error=error,
+                run_at=now + timedelta(seconds=backoff(job.attempts)),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now, last_error=error)
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker died mid-run (running longer than
+    ``JOB_TIMEOUT`` seconds); ones out of attempts are marked failed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOB_TIMEOUT', 600))
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), last_error='Worker timed out',
+    )
+    return stale.update(status=Job.QUEUED, key=None, run_at=timezone.now()) + failed
+
+
+def schedule_periodic():
+    """Queue the next run of every ``JOB_SCHEDULE`` task that has none queued yet."""
+    for name, interval in _setting('JOB_SCHEDULE', {}).items():
+        key = f'schedule:{name}'
+        if not Job.objects.filter(key=key, status=Job.QUEUED).exists():
+            enqueue(name, delay=interval, key=key)
+
+
+def purge_finished(older_than=None):
+    """Delete done jobs older than ``JOB_RETENTION`` seconds; failed ones are kept for inspection."""
+    seconds = older_than if older_than is not None else _setting('JOB_RETENTION', 24 * 60 * 60)
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def stats(window=900):
+    """
+    Queue depth per state plus latency: the age of the oldest ready job, and
+    the average wait (ready to started) and run time of the jobs finished in
+    the last ``window`` seconds.
+    """
+    now = timezone.now()
+    depth = Job.objects.aggregate(
+        ready=Count('pk', filter=Q(status=Job.QUEUED, run_at__lte=now)),
+        scheduled=Count('pk', filter=Q(status=Job.QUEUED, run_at__gt=now)),
+        running=Count('pk', filter=Q(status=Job.RUNNING)),
+        failed=Count('pk', filter=Q(status=Job.FAILED)),
+        oldest_ready=Min('run_at', filter=Q(status=Job.QUEUED, run_at__lte=now)),
+    )
+    recent = Job.objects.filter(status=Job.DONE, finished_at__gte=now - timedelta(seconds=window)).aggregate(
+        done=Count('pk'),
+        wait=Avg(F('started_at') - F('run_at')),
+        runtime=Avg(F('finished_at') - F('started_at')),
+    )
+    oldest = depth.pop('oldest_ready')
+
+    def seconds(value):
+        return round(value.total_seconds(), 3) if value is not None else None
+
+    return {
+        **depth,
+        'oldest_ready_age': seconds(now - oldest) if oldest else 0.0,
+        'done_recently': recent['done'],
+        'avg_wait': seconds(recent['wait']),
+        'avg_runtime': seconds(recent['runtime']),
+    }
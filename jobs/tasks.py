@@ -0,0 +1,6 @@
+from .queue import purge_finished, task
+
+
+@task('jobs.purge_finished')
+def purge_finished_jobs():
+    purge_finished()
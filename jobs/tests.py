@@ -0,0 +1,137 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from orders.models import CartItem
+from store.models import Product
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task('tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+def run_worker():
+    out = StringIO()
+    call_command('runworker', '--once', stdout=out, stderr=StringIO())
+    return out.getvalue()
+
+
+@override_settings(JOB_SCHEDULE={})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_ready_jobs_in_order(self):
+        queue.enqueue('tests.record', {'value': 1})
+        queue.enqueue('tests.record', {'value': 2})
+        queue.enqueue('tests.record', {'value': 3}, delay=60)
+        self.assertIn('2 done, 0 failed', run_worker())
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.get(status=Job.QUEUED).payload, {'value': 3})
+
+    def test_a_claimed_job_is_not_claimed_twice(self):
+        queue.enqueue('tests.record', {'value': 1})
+        self.assertEqual(len(queue.claim('worker-a')), 1)
+        self.assertEqual(queue.claim('worker-b'), [])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.worker, job.attempts), (Job.RUNNING, 'worker-a', 1))
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = queue.enqueue('tests.explode', max_attempts=2)
+        run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_backoff_grows_and_is_capped(self):
+        with self.settings(JOB_BACKOFF_BASE=5, JOB_BACKOFF_MAX=60):
+            self.assertLess(queue.backoff(1), queue.backoff(3))
+            self.assertLessEqual(queue.backoff(10), 66)
+
+    def test_key_dedups_queued_jobs(self):
+        first = queue.enqueue('tests.record', {'value': 1}, key='only-one')
+        second = queue.enqueue('tests.record', {'value': 2}, key='only-one')
+        self.assertEqual(first.pk, second.pk)
+        run_worker()
+        # Once the first has run, the key is free again.
+        self.assertNotEqual(queue.enqueue('tests.record', {'value': 3}, key='only-one').pk, first.pk)
+
+    def test_stale_running_jobs_are_requeued(self):
+        queue.enqueue('tests.record', {'value': 1})
+        queue.claim('dead-worker')
+        Job.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.requeue_stale(), 1)
+        run_worker()
+        self.assertEqual(calls, [1])
+
+    def test_unknown_tasks_fail_without_retrying(self):
+        queue.enqueue('tests.missing')
+        run_worker()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_stats(self):
+        queue.enqueue('tests.record', {'value': 1})
+        queue.enqueue('tests.record', {'value': 2}, delay=60)
+        Job.objects.filter(payload={'value': 1}).update(run_at=timezone.now() - timedelta(seconds=5))
+        stats = queue.stats()
+        self.assertEqual((stats['ready'], stats['scheduled'], stats['running']), (1, 1, 0))
+        self.assertGreaterEqual(stats['oldest_ready_age'], 5)
+        run_worker()
+        stats = queue.stats()
+        self.assertEqual((stats['ready'], stats['done_recently']), (0, 1))
+        self.assertGreaterEqual(stats['avg_wait'], 5)
+
+        client = APIClient()
+        self.assertEqual(client.get('/api/jobs/stats/').status_code, 401)
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@example.com', 'pass12345'))
+        self.assertEqual(client.get('/api/jobs/stats/').data['scheduled'], 1)
+
+    def test_periodic_tasks_are_scheduled_once(self):
+        with self.settings(JOB_SCHEDULE={'tests.record': 60}):
+            queue.schedule_periodic()
+            queue.schedule_periodic()
+        self.assertEqual(Job.objects.filter(key='schedule:tests.record').count(), 1)
+
+
+@override_settings(JOB_SCHEDULE={})
+class OrderConfirmationJobTests(TestCase):
+    def test_checkout_queues_the_confirmation_email(self):
+        user = User.objects.create_user(username='player1', password='pass12345')
+        product = Product.objects.create(
+            name='Game Gear', brand='Sega', release_year=1990, price='149.99', platform='Game Gear',
+        )
+        item = CartItem.objects.create(user=user, product=product, quantity=2)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/orders/', {
+            'items': [item.id], 'shipping_email': 'p1@example.com',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['p1@example.com'])
+        self.assertIn('2 item(s)', mail.outbox[0].body)
@@ -0,0 +1,12 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import queue
+
+
+class JobStatsView(APIView):
+    """Admin-only: background job queue depth and latency"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(queue.stats())
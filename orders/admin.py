@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import CartItem, Order
+from .models import ArchivedOrder, CartItem, Order
 
 # Register your models here.
 
 admin.site.register(CartItem)
 admin.site.register(Order)
+admin.site.register(ArchivedOrder)
@@ -0,0 +1,91 @@
+"""
+Order archival.
+
+Orders older than ``ORDER_ARCHIVE_AFTER_DAYS`` move, lines included, from
+``Order``/``OrderItem`` to ``ArchivedOrder``/``ArchivedOrderItem`` in
+batches of one transaction each, so the hot tables (and their indexes) only
+hold recent history. Ids are kept, which lets the order detail view fall
+back to the archive and ``restore_orders`` move orders back unchanged.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+def archive_age():
+    return timedelta(days=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365))
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _move(order_ids, source, source_item, target, target_item):
+    """Copy the orders and their lines to the target tables, then delete the source rows."""
+    # Only the columns both sides have (the archive adds archived_at).
+    order_columns = [c for c in _columns(source) if c in _columns(target)]
+    orders = list(source.objects.filter(pk__in=order_ids).values(*order_columns))
+    target.objects.bulk_create([target(**row) for row in orders])
+    # bulk_create stamps auto_now_add fields with the current time; put the
+    # original ones back (Order.created_at on restore).
+    for field in target._meta.concrete_fields:
+        if getattr(field, 'auto_now_add', False) and field.attname in order_columns:
+            target.objects.filter(pk__in=order_ids).update(**{field.attname: Case(
+                *[When(pk=row['id'], then=Value(row[field.attname])) for row in orders],
+                output_field=field.__class__(),
+            )})
+    target_item.objects.bulk_create([
+        target_item(**row)
+        for row in source_item.objects.filter(order_id__in=order_ids).values(*_columns(source_item))
+    ])
+    source_item.objects.filter(order_id__in=order_ids).delete()
+    source.objects.filter(pk__in=order_ids).delete()
+
+
+def archive_orders(older_than=None, batch_size=500):
+    """
+    Archive every order created before ``now - older_than`` (default
+    ``archive_age()``), ``batch_size`` orders per transaction. Orders locked
+    by a concurrent write are skipped until the next run. Returns the count.
+    """
+    cutoff = timezone.now() - (older_than if older_than is not None else archive_age())
+    archived = 0
+    while True:
+        with transaction.atomic():
+            order_ids = list(
+                Order.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at', 'id')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if order_ids:
+                _move(order_ids, Order, OrderItem, ArchivedOrder, ArchivedOrderItem)
+        archived += len(order_ids)
+        if len(order_ids) < batch_size:
+            return archived
+
+
+@transaction.atomic
+def restore_orders(order_ids):
+    """Move archived orders back into the hot tables. Returns how many were restored."""
+    order_ids = list(ArchivedOrder.objects.filter(pk__in=order_ids).values_list('pk', flat=True))
+    if order_ids:
+        _move(order_ids, ArchivedOrder, ArchivedOrderItem, Order, OrderItem)
+    return len(order_ids)
+
+
+def table_stats():
+    """Row counts of the hot and archive tables, plus their index sizes in bytes on Postgres."""
+    stats = {}
+    for model in (Order, OrderItem, ArchivedOrder, ArchivedOrderItem):
+        table = model._meta.db_table
+        stats[table] = {'rows': model.objects.count(), 'index_bytes': None}
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_indexes_size(%s::regclass)', [table])
+                stats[table]['index_bytes'] = cursor.fetchone()[0]
+    return stats
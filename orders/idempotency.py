@@ -0,0 +1,118 @@
+"""
+``Idempotency-Key`` support for POST endpoints.
+
+The first request with a key claims it by inserting an ``IdempotencyKey``
+row (the unique constraint settles races); its response is stored on the
+row, and any retry with the same key and body gets that stored response
+back instead of running the view again. Keys expire after
+``IDEMPOTENCY_KEY_TTL`` seconds.
+
+The view's writes and the stored response commit together, so a worker that
+dies mid-request leaves only an unanswered claim behind. Such a claim blocks
+retries with 409 until it is ``IDEMPOTENCY_LEASE_SECONDS`` old; the next
+retry then takes it over and runs the view.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def lease():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 5 * 60))
+
+
+def purge_expired():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    raw = '|'.join([request.method, request.path, body])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _error(message, code):
+    return Response({'error': message}, status=code)
+
+
+def _claim(user, key, digest):
+    """Return ``(record, None)`` for a fresh claim or ``(None, response)`` to answer with."""
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=digest, expires_at=now + key_ttl()
+            ), None
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if existing is not None and existing.status_code is None and existing.created_at <= now - lease():
+        # Abandoned claim: take it over unless another retry got there first.
+        taken = IdempotencyKey.objects.filter(
+            pk=existing.pk, status_code__isnull=True, created_at=existing.created_at
+        ).update(fingerprint=digest, created_at=now, expires_at=now + key_ttl())
+        if taken:
+            existing.fingerprint, existing.created_at, existing.expires_at = digest, now, now + key_ttl()
+            return existing, None
+    if existing is None or existing.status_code is None:
+        return None, _error('A request with this Idempotency-Key is still in progress.', status.HTTP_409_CONFLICT)
+    if existing.fingerprint != digest:
+        return None, _error(
+            'This Idempotency-Key was already used with a different request.',
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(existing.response_body, status=existing.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return None, response
+
+
+def idempotent(view_method):
+    """
+    Make a viewset action replay its response for a repeated ``Idempotency-Key``.
+    Requests without the header run as usual. Raised exceptions and server
+    errors release the key so the client can retry.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.', status.HTTP_400_BAD_REQUEST)
+
+        record, replay = _claim(request.user, key, fingerprint(request))
+        if replay is not None:
+            return replay
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    record.status_code = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status_code', 'response_body'])
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        return response
+    return wrapper
@@ -0,0 +1,122 @@
+"""
+Stock reservations for limited-run products.
+
+Stock on hand lives in ``Product.stock`` and only moves through conditional
+UPDATEs (``take_stock`` / ``return_stock``), so buyers of the same product
+never queue behind a long-held row lock. A reservation is stock already
+taken on a user's behalf: checkout turns it into the order, and
+``release_expired`` hands back holds that were never checked out.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from store.models import Product
+from .models import StockReservation
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Not enough stock for products {self.product_ids}')
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 600))
+
+
+def _needed(cart_items):
+    # Units per stock-tracked product; untracked products are never reserved.
+    needed = defaultdict(int)
+    for item in cart_items:
+        if item.product.stock is not None:
+            needed[item.product.id] += item.quantity
+    return needed
+
+
+def _settle_holds(user, needed):
+    """
+    Make the stock taken for ``user`` equal ``needed``: their current holds
+    count towards it, any shortfall is taken and any surplus returned. The
+    holds themselves are deleted. Must run inside a transaction so a shortage
+    rolls back everything taken before it.
+    """
+    holds = list(
+        StockReservation.objects.filter(user=user)
+        .select_for_update()
+        .values_list('id', 'product_id', 'quantity')
+    )
+    held = defaultdict(int)
+    for _, product_id, quantity in holds:
+        held[product_id] += quantity
+
+    short = [
+        product_id for product_id, quantity in needed.items()
+        if quantity > held[product_id]
+        and not Product.objects.take_stock(product_id, quantity - held[product_id])
+    ]
+    if short:
+        raise OutOfStock(short)
+
+    Product.objects.return_stock({
+        product_id: quantity - needed.get(product_id, 0) for product_id, quantity in held.items()
+    })
+    if holds:
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in holds]).delete()
+
+
+@transaction.atomic
+def reserve_cart(user, cart_items):
+    """
+    Hold stock for ``cart_items`` until the reservation TTL runs out,
+    replacing any earlier holds of the same user. Returns the expiry, or
+    None when nothing in the cart is stock-tracked.
+    """
+    needed = _needed(cart_items)
+    _settle_holds(user, needed)
+    if not needed:
+        return None
+    expires_at = timezone.now() + reservation_ttl()
+    StockReservation.objects.bulk_create([
+        StockReservation(user=user, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in needed.items()
+    ])
+    return expires_at
+
+
+def consume_reservations(user, cart_items):
+    """Convert the user's holds into the stock sold by a checkout; call inside its transaction."""
+    _settle_holds(user, _needed(cart_items))
+
+
+def release_expired(batch_size=500, now=None):
+    """
+    Return the stock of every hold that expired by ``now``, one batch per
+    transaction. Holds locked by an in-flight checkout are skipped (on
+    databases with SKIP LOCKED) and left to that checkout.
+    Returns ``(reservations released, units returned)``.
+    """
+    now = now or timezone.now()
+    released = units = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StockReservation.objects.filter(expires_at__lte=now)
+                .order_by('expires_at')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                break
+            returned = defaultdict(int)
+            for _, product_id, quantity in rows:
+                returned[product_id] += quantity
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            Product.objects.return_stock(returned)
+        released += len(rows)
+        units += sum(returned.values())
+        if len(rows) < batch_size:
+            break
+    return released, units
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.archive import archive_age, archive_orders, restore_orders, table_stats
+
+
+class Command(BaseCommand):
+    help = 'Move old orders into the archive tables (or restore them), one batch per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help='Archive orders older than DAYS (default ORDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Orders moved per transaction')
+        parser.add_argument('--restore', type=int, nargs='+', metavar='ORDER_ID',
+                            help='Move these archived orders back instead')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print row counts (and index sizes on Postgres) of the order tables before and after')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['stats']:
+            self.write_stats('Before')
+        if options['restore']:
+            restored = restore_orders(options['restore'])
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} orders'))
+        else:
+            days = options['older_than']
+            archived = archive_orders(
+                older_than=timedelta(days=days) if days is not None else archive_age(),
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders'))
+
+        if options['stats']:
+            self.write_stats('After')
+
+    def write_stats(self, label):
+        self.stdout.write(f'{label}:')
+        for table, stats in table_stats().items():
+            index = f", {stats['index_bytes']} index bytes" if stats['index_bytes'] is not None else ''
+            self.stdout.write(f"  {table}: {stats['rows']} rows{index}")
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the stock held by expired checkout reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Reservations released per transaction')
+        parser.add_argument('--loop', type=int, metavar='SECONDS',
+                            help='Keep running, releasing every SECONDS (for a worker process instead of cron)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        while True:
+            released, units = release_expired(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Released {released} expired reservations ({units} units back in stock)'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
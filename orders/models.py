@@ -1,14 +1,104 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from store.models import Product
 
 
+def money():
+    return DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartItemQuerySet(models.QuerySet):
+    def summary(self):
+        """
+        Cart lines with just the display fields of their product, each line's
+        total, and the cart-wide quantity and total repeated on every row by
+        window functions, so the whole summary is one joined query.
+        """
+        line_total = F('quantity') * F('product__price')
+        return (
+            self.select_related('product')
+            .only('id', 'quantity', 'product__id', 'product__name', 'product__brand',
+                  'product__platform', 'product__price', 'product__image')
+            .annotate(
+                line_total=ExpressionWrapper(line_total, output_field=money()),
+                cart_quantity=Window(Sum('quantity')),
+                cart_total=Window(Sum(line_total, output_field=money())),
+            )
+            .order_by('added_at', 'id')
+        )
+
+    def add(self, user, product_id, quantity):
+        """
+        Add ``quantity`` of a product to the user's cart as an atomic upsert:
+        an ``F()`` increment of the existing line, or an insert that falls
+        back to the increment if a concurrent add created the line first.
+        Returns True when the line was created.
+        """
+        increment = {'quantity': F('quantity') + quantity}
+        if self.filter(user=user, product_id=product_id).update(**increment):
+            return False
+        try:
+            with transaction.atomic():
+                self.create(user=user, product_id=product_id, quantity=quantity)
+            return True
+        except IntegrityError:
+            self.filter(user=user, product_id=product_id).update(**increment)
+            return False
+
+    @transaction.atomic
+    def apply_batch(self, user, clear=False, remove=(), set_quantities=None, add=None):
+        """
+        Apply a batch of cart changes in one transaction with one statement
+        per kind of change: ``clear`` empties the cart, ``remove`` deletes
+        lines by id, ``set_quantities`` maps line id to a new quantity and
+        ``add`` maps product id to the units to add. Raises
+        ``CartItem.DoesNotExist`` (rolling everything back) when a line to
+        remove or set isn't in the user's cart.
+        """
+        lines = self.filter(user=user)
+        if remove:
+            deleted, _ = lines.filter(pk__in=remove).delete()
+            if deleted != len(remove):
+                raise self.model.DoesNotExist('Cart line not found.')
+        if clear:
+            lines.delete()
+        if set_quantities:
+            updated = lines.filter(pk__in=set_quantities).update(quantity=Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in set_quantities.items()],
+                output_field=IntegerField(),
+            ))
+            if updated != len(set_quantities):
+                raise self.model.DoesNotExist('Cart line not found.')
+        if add:
+            # Make sure every line exists (a concurrent add may create one
+            # first, which is fine), then increment them all in one UPDATE.
+            self.bulk_create(
+                [self.model(user=user, product_id=product_id, quantity=0) for product_id in add],
+                ignore_conflicts=True,
+            )
+            lines.filter(product_id__in=add).update(quantity=F('quantity') + Case(
+                *[When(product_id=product_id, then=Value(quantity)) for product_id, quantity in add.items()],
+                output_field=IntegerField(),
+            ))
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # One line per product: adds increment it (see CartItemQuerySet.add).
+            models.UniqueConstraint(fields=['user', 'product'], name='cartitem_user_product_unique'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
 
@@ -24,6 +114,19 @@ class OrderItem(models.Model):
         return f"{self.product_name} x {self.quantity}"
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_item_count(self):
+        """Annotate the units in each order with a correlated subquery, no GROUP BY over orders."""
+        units = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        return self.annotate(item_count=Coalesce(Subquery(units, output_field=IntegerField()), 0))
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -37,5 +140,110 @@ class Order(models.Model):
     payment_expiry = models.CharField(max_length=5, blank=True, null=True)
     payment_cvv = models.CharField(max_length=3, blank=True, null=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            # Finds the orders old enough to archive (orders/archive.py).
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.user.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so a save can tell whether it changed.
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
+
+
+class ArchivedOrder(models.Model):
+    """
+    An order moved out of the hot tables by ``orders.archive``, with its
+    original id and fields, so the detail view and a restore see it unchanged.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    created_at = models.DateTimeField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, default='pending')
+    shipping_name = models.CharField(max_length=100, blank=True, null=True)
+    shipping_email = models.EmailField(blank=True, null=True)
+    shipping_phone = models.CharField(max_length=30, blank=True, null=True)
+    shipping_address = models.CharField(max_length=255, blank=True, null=True)
+    payment_card = models.CharField(max_length=20, blank=True, null=True)
+    payment_expiry = models.CharField(max_length=5, blank=True, null=True)
+    payment_cvv = models.CharField(max_length=3, blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='archived_order_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} by {self.user_id}"
+
+    @property
+    def item_count(self):
+        # Summed from the prefetched lines; archived orders are read one at a time.
+        return sum(item.quantity for item in self.order_items.all())
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    product_name = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.product_name} x {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """Units of a stock-tracked product held for one user's checkout until ``expires_at``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+            models.Index(fields=['user', 'product'], name='reservation_user_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.user_id} until {self.expires_at}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied ``Idempotency-Key`` and the response it produced, so
+    a retried POST is answered from here instead of running again.
+    ``status_code`` stays null while the first request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} for {self.user_id}"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import CartItem, Order, OrderItem
+from .models import ArchivedOrder, CartItem, Order, OrderItem
+from store.images import manifest
+from store.models import Product
 from store.serializers import ProductSerializer
 
 
@@ -12,6 +14,83 @@ class CartItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'added_at']
 
 
+class CartAddSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.only('pk'))
+    quantity = serializers.IntegerField(min_value=1, max_value=1000, default=1)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove', 'clear'])
+    id = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, min_value=0, max_value=1000)
+
+    def validate(self, attrs):
+        required = {'add': ['product'], 'set': ['id', 'quantity'], 'remove': ['id'], 'clear': []}[attrs['op']]
+        missing = [field for field in required if field not in attrs]
+        if missing:
+            raise serializers.ValidationError(f"'{attrs['op']}' needs {', '.join(missing)}.")
+        if attrs['op'] == 'add' and attrs.setdefault('quantity', 1) < 1:
+            raise serializers.ValidationError("'add' needs a quantity of at least 1.")
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    A list of cart changes, folded into one set of bulk changes: a quantity
+    of 0 removes the line and adds of the same product are summed.
+    """
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=200)
+
+    def validate_operations(self, operations):
+        batch = {'clear': False, 'remove': set(), 'set_quantities': {}, 'add': {}}
+        touched = set()
+        for operation in operations:
+            op = operation['op']
+            if op == 'clear':
+                batch['clear'] = True
+            elif op == 'add':
+                product = operation['product']
+                batch['add'][product] = batch['add'].get(product, 0) + operation['quantity']
+            else:
+                line = operation['id']
+                if line in touched:
+                    raise serializers.ValidationError(f'Cart line {line} is changed more than once.')
+                touched.add(line)
+                if op == 'remove' or operation['quantity'] == 0:
+                    batch['remove'].add(line)
+                else:
+                    batch['set_quantities'][line] = operation['quantity']
+
+        if batch['add']:
+            found = set(Product.objects.filter(pk__in=batch['add']).values_list('pk', flat=True))
+            unknown = sorted(set(batch['add']) - found)
+            if unknown:
+                raise serializers.ValidationError(f'Unknown products: {unknown}.')
+        return batch
+
+
+class CartProductSerializer(serializers.ModelSerializer):
+    """Just the product fields the cart and checkout pages display."""
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'brand', 'platform', 'price', 'image', 'thumbnail']
+
+    def get_thumbnail(self, obj):
+        return manifest.thumbnail(obj.image)
+
+
+class CartSummaryItemSerializer(serializers.ModelSerializer):
+    product = CartProductSerializer(read_only=True)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product', 'quantity', 'line_total']
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -19,24 +98,37 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = serializers.SerializerMethodField()
+    # Lines come from the prefetched order_items, or from the order itself
+    # when it was just created.
+    items = OrderItemSerializer(source='order_items', many=True, read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Order
         fields = [
-            'id', 'user', 'items', 'created_at', 'total_price', 'status',
+            'id', 'user', 'items', 'item_count', 'created_at', 'total_price', 'status',
             'shipping_name', 'shipping_email', 'shipping_phone', 'shipping_address',
             'payment_card', 'payment_expiry', 'payment_cvv'
         ]
         read_only_fields = ['user', 'created_at', 'status']
-    
-    def get_items(self, obj):
-        # Try to get items from OrderItem first (new system)
-        try:
-            if hasattr(obj, 'order_items') and obj.order_items.exists():
-                return OrderItemSerializer(obj.order_items.all(), many=True).data
-        except Exception:
-            pass
-        
-        # Fallback: return empty list for old orders
-        return [] 
\ No newline at end of file
+        # Card details are accepted at checkout but never sent back.
+        extra_kwargs = {
+            'payment_card': {'write_only': True},
+            'payment_expiry': {'write_only': True},
+            'payment_cvv': {'write_only': True},
+        }
+
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """An archived order, shaped exactly like a live one."""
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+
+
+class OrderSummarySerializer(OrderSerializer):
+    """Order history row: the stored total and an annotated item count, no lines."""
+
+    class Meta(OrderSerializer.Meta):
+        fields = ['id', 'item_count', 'created_at', 'total_price', 'status']
+        read_only_fields = fields
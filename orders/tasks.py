@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from jobs.queue import task
+from .archive import archive_orders
+from .idempotency import purge_expired
+from .inventory import release_expired
+from .models import Order
+
+
+@task('orders.release_reservations')
+def release_reservations():
+    release_expired()
+
+
+@task('orders.purge_idempotency_keys')
+def purge_idempotency_keys():
+    purge_expired()
+
+
+@task('orders.archive_orders')
+def archive_old_orders():
+    archive_orders()
+
+
+@task('orders.send_order_confirmation')
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').with_item_count().get(pk=order_id)
+    recipient = order.shipping_email or order.user.email
+    if not recipient:
+        return
+    send_mail(
+        subject=f'Your Retro Gaming Store order #{order.id}',
+        message=(
+            f"Hi {order.shipping_name or order.user.username},\n\n"
+            f"Thanks for your order #{order.id}: {order.item_count} item(s), "
+            f"total ${order.total_price}.\n"
+            f"We'll let you know when it ships.\n"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[recipient],
+    )
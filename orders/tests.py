@@ -1,3 +1,572 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from store.models import Product
+from store.serializers import ProductSerializer
+from .models import ArchivedOrder, CartItem, CartItemQuerySet, IdempotencyKey, Order, OrderItem, StockReservation
+
+
+class CartQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def _add_items(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f'Console {i}', brand='Sega', release_year=1990,
+                price='10.00', platform='Genesis',
+            )
+            CartItem.objects.create(user=self.user, product=product, quantity=1)
+
+    def test_cart_query_count_is_flat(self):
+        self._add_items(2)
+        with self.assertNumQueries(2):
+            self.client.get('/api/cart/')
+        self._add_items(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.data['count'], 22)
+
+
+class OrderPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            Order.objects.create(user=self.user, total_price='10.00')
+
+    def test_cursor_mode_walks_newest_first(self):
+        response = self.client.get('/api/orders/', {'cursor': '', 'page_size': 2})
+        ids = [o['id'] for o in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(o['id'] for o in response.data['results'])
+        self.assertEqual(ids, sorted(Order.objects.values_list('id', flat=True), reverse=True))
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def _add_items(self, count, price='9.99', quantity=3):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f'Cartridge {i}', brand='Nintendo', release_year=1991,
+                price=price, platform='SNES', description='x' * 2000,
+            )
+            CartItem.objects.create(user=self.user, product=product, quantity=quantity)
+
+    def test_empty_cart(self):
+        response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data, {'count': 0, 'quantity': 0, 'total': '0.00', 'items': []})
+
+    def test_totals_are_computed_in_one_query(self):
+        self._add_items(60)
+        other = User.objects.create_user(username='player2', password='pass12345')
+        CartItem.objects.create(user=other, product=Product.objects.first(), quantity=5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data['count'], 60)
+        self.assertEqual(response.data['quantity'], 180)
+        self.assertEqual(response.data['total'], '1798.20')
+        item = response.data['items'][0]
+        self.assertEqual(item['line_total'], '29.97')
+        self.assertEqual(set(item['product']), {'id', 'name', 'brand', 'platform', 'price', 'image', 'thumbnail'})
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def _fill_cart(self, count):
+        start = Product.objects.count()
+        return [
+            CartItem.objects.create(
+                user=self.user, quantity=2,
+                product=Product.objects.create(
+                    name=f'Handheld {i}', brand='Nintendo', release_year=1989,
+                    price='5.25', platform='Game Boy',
+                ),
+            ).id
+            for i in range(start, start + count)
+        ]
+
+    def _checkout(self, item_ids, **extra):
+        return self.client.post('/api/orders/', {
+            'items': item_ids, 'shipping_name': 'Player One',
+            'shipping_email': 'p1@example.com', **extra,
+        }, format='json')
+
+    def test_checkout_writes_order_lines_and_clears_cart(self):
+        item_ids = self._fill_cart(3)
+        response = self._checkout(item_ids)
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(str(order.total_price), '31.50')
+        self.assertEqual(order.order_items.count(), 3)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_query_count_is_flat_as_the_cart_grows(self):
+        counts = []
+        for size in (1, 10, 50):
+            item_ids = self._fill_cart(size)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self._checkout(item_ids)
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_failed_checkout_leaves_no_partial_order(self):
+        item_ids = self._fill_cart(2)
+        response = self._checkout(item_ids, shipping_email='not-an-email')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_foreign_cart_items_are_rejected(self):
+        other = User.objects.create_user(username='player2', password='pass12345')
+        item_ids = self._fill_cart(1)
+        CartItem.objects.filter(id__in=item_ids).update(user=other)
+        response = self._checkout(item_ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.other = User.objects.create_user(username='player2', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Virtual Boy', brand='Nintendo', release_year=1995,
+            price='180.00', platform='Virtual Boy', stock=3,
+        )
+
+    def _checkout(self, user, quantity):
+        item, _ = CartItem.objects.update_or_create(
+            user=user, product=self.product, defaults={'quantity': quantity}
+        )
+        self.client.force_authenticate(user)
+        return self.client.post('/api/orders/', {'items': [item.id]}, format='json')
+
+    def _stock(self):
+        self.product.refresh_from_db(fields=['stock'])
+        return self.product.stock
+
+    def test_checkout_takes_stock(self):
+        self.assertEqual(self._checkout(self.user, 2).status_code, 201)
+        self.assertEqual(self._stock(), 1)
+
+    def test_checkout_beyond_stock_is_rejected_and_rolled_back(self):
+        response = self._checkout(self.user, 4)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['products'], [self.product.id])
+        self.assertEqual(self._stock(), 3)
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(CartItem.objects.exists())
+
+    def test_reservation_holds_stock_until_checkout(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        response = self.client.post('/api/cart/reserve/')
+        self.assertIsNotNone(response.data['expires_at'])
+        self.assertEqual(self._stock(), 1)
+
+        # Someone else can only get what is left.
+        self.assertEqual(self._checkout(self.other, 2).status_code, 409)
+        self.assertEqual(self._checkout(self.other, 1).status_code, 201)
+
+        # The holder's checkout uses the hold instead of taking stock again.
+        self.client.force_authenticate(self.user)
+        item_ids = list(CartItem.objects.filter(user=self.user).values_list('id', flat=True))
+        response = self.client.post('/api/orders/', {'items': item_ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._stock(), 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_reservations_are_released(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        self.client.post('/api/cart/reserve/')
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('release_reservations', stdout=out)
+        self.assertIn('Released 1 expired reservations (2 units', out.getvalue())
+        self.assertEqual(self._stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_api_cannot_write_stock(self):
+        url = f'/api/products/{self.product.id}/'
+        self.assertEqual(self.client.patch(url, {'stock': 999}, format='json').status_code, 200)
+        self.assertEqual(self._stock(), 3)
+
+        # An edit of other fields doesn't write back the stock it read.
+        stale = Product.objects.get(pk=self.product.pk)
+        Product.objects.take_stock(self.product.pk, 2)
+        serializer = ProductSerializer(stale, data={'price': '150.00'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self._stock(), 1)
+
+    def test_untracked_products_are_not_reserved(self):
+        self.product.stock = None
+        self.product.save()
+        CartItem.objects.create(user=self.user, product=self.product, quantity=50)
+        response = self.client.post('/api/cart/reserve/')
+        self.assertIsNone(response.data['expires_at'])
+        self.assertEqual(self._checkout(self.user, 1).status_code, 201)
+
+
+class StockContentionTests(TransactionTestCase):
+    buyers = 24
+    stock = 10
+
+    def test_concurrent_buyers_never_oversell(self):
+        product = Product.objects.create(
+            name='Limited Edition', brand='Sega', release_year=1998,
+            price='399.00', platform='Dreamcast', stock=self.stock,
+        )
+        sold = []
+        barrier = threading.Barrier(self.buyers)
+
+        def buy():
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        with transaction.atomic():
+                            if Product.objects.take_stock(product.pk, 1):
+                                sold.append(1)
+                        return
+                    except OperationalError:
+                        # SQLite allows one writer at a time; retry like a busy client would.
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(self.buyers)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        product.refresh_from_db()
+        self.assertEqual(len(sold), self.stock, f'{self.buyers} buyers in {elapsed:.3f}s')
+        self.assertEqual(product.stock, 0)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Neo Geo AES', brand='SNK', release_year=1990, price='650.00', platform='Neo Geo',
+        )
+
+    def _orders(self, count, lines=3):
+        for _ in range(count):
+            order = Order.objects.create(
+                user=self.user, total_price='1950.00', payment_card='4242424242424242',
+                payment_expiry='12/34', payment_cvv='123',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=self.product, product_name='Neo Geo AES', price='650.00', quantity=1)
+                for _ in range(lines)
+            ])
+
+    def test_history_is_a_flat_number_of_queries(self):
+        self._orders(2)
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/')
+        self._orders(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.data['count'], 22)
+        self.assertEqual(len(response.data['results']), 10)
+        row = response.data['results'][0]
+        self.assertEqual(row['item_count'], 3)
+        self.assertNotIn('items', row)
+        ids = [o['id'] for o in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_detail_loads_lines_in_one_extra_query(self):
+        self._orders(1, lines=4)
+        order = Order.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(len(response.data['items']), 4)
+        self.assertEqual(response.data['item_count'], 4)
+
+    def test_card_fields_are_never_returned(self):
+        self._orders(1)
+        order = Order.objects.get()
+        responses = [
+            self.client.get('/api/orders/').data['results'][0],
+            self.client.get(f'/api/orders/{order.id}/').data,
+        ]
+        item = CartItem.objects.create(user=self.user, product=self.product)
+        responses.append(self.client.post('/api/orders/', {
+            'items': [item.id], 'payment_card': '4242424242424242',
+            'payment_expiry': '12/34', 'payment_cvv': '123',
+        }, format='json').data)
+        self.assertEqual(responses[-1]['item_count'], 1)
+        for data in responses:
+            for field in ('payment_card', 'payment_expiry', 'payment_cvv'):
+                self.assertNotIn(field, data)
+        self.assertEqual(Order.objects.latest('id').payment_cvv, '123')
+
+
+class CartUpsertTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Atari Lynx', brand='Atari', release_year=1989, price='179.99', platform='Lynx',
+        )
+
+    def _add(self, quantity=1, key=None, **extra):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            '/api/cart/', {'product': self.product.id, 'quantity': quantity, **extra},
+            format='json', **headers
+        )
+
+    def test_repeated_adds_increment_one_line(self):
+        self.assertEqual(self._add(2).status_code, 201)
+        response = self._add(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_add_falls_back_to_increment_when_insert_races(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=1)
+        # Simulate losing the race: the UPDATE saw no line, the INSERT hits the constraint.
+        with mock.patch.object(CartItemQuerySet, 'update', side_effect=[0, 1]) as update:
+            self.assertFalse(CartItem.objects.add(self.user, self.product.id, 2))
+        self.assertEqual(update.call_count, 2)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_invalid_adds_are_rejected(self):
+        self.assertEqual(self._add(0).status_code, 400)
+        response = self.client.post('/api/cart/', {'product': 999999}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_idempotency_key_replays_the_first_response(self):
+        first = self._add(1, key='add-1')
+        second = self._add(1, key='add-1')
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+        self.assertEqual(self._add(1, key='add-2').data['quantity'], 2)
+
+    def test_idempotency_key_reused_with_another_body_is_rejected(self):
+        self._add(1, key='add-1')
+        self.assertEqual(self._add(4, key='add-1').status_code, 422)
+
+    def test_expired_keys_run_again(self):
+        self._add(1, key='add-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self._add(1, key='add-1')
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+
+    def test_abandoned_claims_are_taken_over_after_the_lease(self):
+        # A worker died after claiming the key: nothing was written or answered.
+        claim = IdempotencyKey.objects.create(
+            user=self.user, key='add-1', fingerprint='lost', expires_at=timezone.now() + timedelta(days=1)
+        )
+        self.assertEqual(self._add(1, key='add-1').status_code, 409)
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self._add(1, key='add-1').status_code, 201)
+        self.assertEqual(self._add(1, key='add-1')['Idempotent-Replayed'], 'true')
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+        claim.refresh_from_db()
+        self.assertEqual(claim.status_code, 201)
+
+    def test_a_failed_response_store_rolls_back_the_view(self):
+        save = IdempotencyKey.save
+
+        def fail_storing_the_response(record, *args, **kwargs):
+            if kwargs.get('update_fields'):
+                raise RuntimeError
+            return save(record, *args, **kwargs)
+
+        with mock.patch.object(IdempotencyKey, 'save', fail_storing_the_response):
+            with self.assertRaises(RuntimeError):
+                self._add(1, key='add-1')
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_retried_checkout_creates_one_order(self):
+        item = CartItem.objects.create(user=self.user, product=self.product)
+        responses = [
+            self.client.post('/api/orders/', {'items': [item.id]}, format='json', HTTP_IDEMPOTENCY_KEY='order-1')
+            for _ in range(2)
+        ]
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertEqual(responses[0].data['id'], responses[1].data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.products = [
+            Product.objects.create(
+                name=f'Controller {i}', brand='Sony', release_year=1995, price='20.00', platform='PlayStation',
+            )
+            for i in range(4)
+        ]
+        self.lines = [
+            CartItem.objects.create(user=self.user, product=product, quantity=1)
+            for product in self.products[:3]
+        ]
+
+    def _batch(self, *operations):
+        return self.client.post('/api/cart/batch/', {'operations': list(operations)}, format='json')
+
+    def test_mixed_batch_is_applied_and_returns_the_summary(self):
+        # Product check, savepoint, DELETE, UPDATE, INSERT, UPDATE, release, summary.
+        with self.assertNumQueries(8):
+            response = self._batch(
+                {'op': 'set', 'id': self.lines[0].id, 'quantity': 4},
+                {'op': 'remove', 'id': self.lines[1].id},
+                {'op': 'set', 'id': self.lines[2].id, 'quantity': 0},
+                {'op': 'add', 'product': self.products[0].id, 'quantity': 1},
+                {'op': 'add', 'product': self.products[3].id, 'quantity': 2},
+                {'op': 'add', 'product': self.products[3].id},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['quantity'], 8)
+        self.assertEqual(response.data['total'], '160.00')
+        quantities = dict(CartItem.objects.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].id: 5, self.products[3].id: 3})
+
+    def test_clear(self):
+        response = self._batch({'op': 'clear'})
+        self.assertEqual(response.data['count'], 0)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_unknown_line_rolls_back_the_whole_batch(self):
+        other = User.objects.create_user(username='player2', password='pass12345')
+        foreign = CartItem.objects.create(user=other, product=self.products[0], quantity=1)
+        response = self._batch(
+            {'op': 'remove', 'id': self.lines[0].id},
+            {'op': 'set', 'id': foreign.id, 'quantity': 9},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 3)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.quantity, 1)
+
+    def test_unknown_lines_are_rejected_alike_for_remove_and_set(self):
+        other = User.objects.create_user(username='player2', password='pass12345')
+        foreign = CartItem.objects.create(user=other, product=self.products[0], quantity=1)
+        responses = [
+            self._batch({'op': 'set', 'id': self.lines[0].id, 'quantity': 2}, {'op': 'remove', 'id': foreign.id}),
+            self._batch({'op': 'remove', 'id': self.lines[0].id}, {'op': 'set', 'id': foreign.id, 'quantity': 2}),
+            self._batch({'op': 'clear'}, {'op': 'remove', 'id': foreign.id}),
+        ]
+        self.assertEqual([r.status_code for r in responses], [400, 400, 400])
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 3)
+        self.assertTrue(CartItem.objects.filter(pk=foreign.pk).exists())
+
+    def test_invalid_operations_are_rejected(self):
+        for operations in (
+            [],
+            [{'op': 'set', 'id': self.lines[0].id}],
+            [{'op': 'add', 'product': 999999}],
+            [{'op': 'remove', 'id': self.lines[0].id}, {'op': 'set', 'id': self.lines[0].id, 'quantity': 2}],
+        ):
+            self.assertEqual(self._batch(*operations).status_code, 400, operations)
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Virtual Boy', brand='Nintendo', release_year=1995, price='180.00', platform='Virtual Boy',
+        )
+
+    def _order(self, days_ago, quantity=2):
+        order = Order.objects.create(user=self.user, total_price='360.00', shipping_name='Player One')
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        OrderItem.objects.create(
+            order=order, product=self.product, product_name='Virtual Boy', price='180.00', quantity=quantity,
+        )
+        return Order.objects.get(pk=order.pk)
+
+    def test_old_orders_move_to_the_archive_in_batches(self):
+        old = [self._order(400 + i) for i in range(5)]
+        recent = self._order(10)
+        out = StringIO()
+        call_command('archive_orders', '--batch-size', '2', '--stats', stdout=out)
+        self.assertIn('Archived 5 orders', out.getvalue())
+        self.assertIn('orders_order: 6 rows', out.getvalue())
+        self.assertIn('orders_order: 1 rows', out.getvalue())
+
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertEqual(OrderItem.objects.count(), 1)
+        archived = ArchivedOrder.objects.get(pk=old[0].pk)
+        self.assertEqual(archived.created_at, old[0].created_at)
+        self.assertEqual(archived.order_items.get().quantity, 2)
+
+        # History lists only the hot table.
+        response = self.client.get('/api/orders/')
+        self.assertEqual([o['id'] for o in response.data['results']], [recent.pk])
+
+    def test_archived_orders_are_served_by_the_detail_view(self):
+        order = self._order(400, quantity=3)
+        live = self.client.get(f'/api/orders/{order.pk}/').data
+        call_command('archive_orders', stdout=StringIO())
+
+        response = self.client.get(f'/api/orders/{order.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, live)
+        self.assertEqual(response.data['item_count'], 3)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='player2', password='pass12345'))
+        self.assertEqual(other.get(f'/api/orders/{order.pk}/').status_code, 404)
+
+    def test_restore_puts_orders_back_unchanged(self):
+        order = self._order(400)
+        call_command('archive_orders', stdout=StringIO())
+        out = StringIO()
+        call_command('archive_orders', '--restore', str(order.pk), stdout=out)
+        self.assertIn('Restored 1 orders', out.getvalue())
+
+        self.assertFalse(ArchivedOrder.objects.exists())
+        restored = Order.objects.get(pk=order.pk)
+        self.assertEqual((restored.created_at, restored.shipping_name), (order.created_at, 'Player One'))
+        self.assertEqual(restored.order_items.get().quantity, 2)
@@ -1,7 +1,24 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import CartItem, Order, OrderItem
-from .serializers import CartItemSerializer, OrderSerializer
+from api.pagination import KeysetOptInPagination
+from jobs.queue import enqueue
+from .idempotency import idempotent
+from .inventory import OutOfStock, consume_reservations, reserve_cart
+from .models import ArchivedOrder, CartItem, Order, OrderItem
+from .serializers import ArchivedOrderSerializer, CartAddSerializer, CartBatchSerializer, CartItemSerializer, CartSummaryItemSerializer, OrderSerializer, OrderSummarySerializer
+
+
+def out_of_stock_response(error):
+    return Response(
+        {'error': 'Some items are out of stock.', 'products': error.product_ids},
+        status=status.HTTP_409_CONFLICT
+    )
 
 
 class CartItemViewSet(viewsets.ModelViewSet):
@@ -11,55 +28,102 @@ class CartItemViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Users can only see their own cart items
-        return CartItem.objects.filter(user=self.request.user)
+        return CartItem.objects.filter(user=self.request.user).select_related('product').order_by('added_at', 'id')
 
+    @idempotent
     def create(self, request, *args, **kwargs):
-        print("=== ADDING TO CART ===")
-        print(f"Request data: {request.data}")
-        print(f"User: {request.user}")
-        print(f"User authenticated: {request.user.is_authenticated}")
-        
-        # Check if item already exists in cart
-        product_id = request.data.get('product')
-        existing_item = CartItem.objects.filter(user=request.user, product_id=product_id).first()
-        
-        if existing_item:
-            # Update quantity if item already exists
-            existing_item.quantity += request.data.get('quantity', 1)
-            existing_item.save()
-            serializer = self.get_serializer(existing_item)
-            print(f"Updated existing cart item: {existing_item}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            # Create new cart item
-            serializer = self.get_serializer(data=request.data)
-            print(f"Serializer data: {request.data}")
-            print(f"Serializer is valid: {serializer.is_valid()}")
-            if serializer.is_valid():
-                # Create the cart item with both user and product
-                cart_item = CartItem.objects.create(
-                    user=request.user,
-                    product_id=product_id,
-                    quantity=request.data.get('quantity', 1)
-                )
-                print(f"Created new cart item: {cart_item}")
-                # Return the serialized data
-                response_serializer = self.get_serializer(cart_item)
-                return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-            else:
-                print(f"Serializer errors: {serializer.errors}")
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Adding a product already in the cart increments its line.
+        data = CartAddSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        created = CartItem.objects.add(
+            request.user, data.validated_data['product'].pk, data.validated_data['quantity']
+        )
+        cart_item = self.get_queryset().get(user=request.user, product=data.validated_data['product'])
+        serializer = self.get_serializer(cart_item)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def get_summary(self):
+        """Lean cart read model: display fields, line totals and SQL-computed totals."""
+        items = list(CartItem.objects.filter(user=self.request.user).summary())
+        total = items[0].cart_total if items else Decimal('0')
+        return {
+            'count': len(items),
+            'quantity': items[0].cart_quantity if items else 0,
+            'total': str(total.quantize(Decimal('0.01'))),
+            'items': CartSummaryItemSerializer(items, many=True).data,
+        }
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        # Used by the cart page, checkout and the cart badge on every load.
+        return Response(self.get_summary())
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def batch(self, request):
+        # Quantity edits, removals and "clear cart" in one round trip; the
+        # response is the updated summary so the page doesn't refetch.
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            CartItem.objects.apply_batch(request.user, **serializer.validated_data['operations'])
+        except CartItem.DoesNotExist:
+            return Response(
+                {'error': 'Some cart items were not found or do not belong to you.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(self.get_summary())
+
+    @action(detail=False, methods=['post'])
+    def reserve(self, request):
+        # Called when checkout opens: hold limited-run stock while the user pays.
+        cart_items = list(self.get_queryset().only('id', 'quantity', 'product__id', 'product__stock'))
+        try:
+            expires_at = reserve_cart(request.user, cart_items)
+        except OutOfStock as e:
+            return out_of_stock_response(e)
+        return Response({'expires_at': expires_at})
+
+
+class OrderPagination(KeysetOptInPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    keyset_ordering = '-created_at'
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderPagination
 
     def get_queryset(self):
-        # Users can only see their own orders
-        return Order.objects.filter(user=self.request.user)
+        # Users can only see their own orders, newest first
+        queryset = Order.objects.filter(user=self.request.user).with_item_count().order_by('-created_at', '-id')
+        if self.action != 'list':
+            # Detail views load every line in one extra query.
+            queryset = queryset.prefetch_related('order_items')
+        return queryset
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderSummarySerializer
+        return OrderSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Old orders live in the archive (orders/archive.py); serve them
+            # from there so links to them keep working.
+            order = get_object_or_404(
+                ArchivedOrder.objects.filter(user=request.user).prefetch_related('order_items'),
+                pk=kwargs['pk'],
+            )
+            return Response(ArchivedOrderSerializer(order, context=self.get_serializer_context()).data)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         user = request.user
@@ -71,50 +135,72 @@ class OrderViewSet(viewsets.ModelViewSet):
                 {'error': 'Order must contain at least one item.'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Get cart items and validate they exist and belong to user
-        cart_items = CartItem.objects.filter(id__in=items, user=user)
-        
-        # Check if all requested items were found
-        if len(cart_items) != len(items):
+        try:
+            item_ids = {int(item_id) for item_id in items}
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'Some cart items were not found or do not belong to you.'}, 
+                {'error': 'Cart item ids must be integers.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Check if cart is empty
-        if not cart_items.exists():
+
+        try:
+            order, serializer = self.checkout(data, user, item_ids)
+        except OutOfStock as e:
+            return out_of_stock_response(e)
+        if order is None:
             return Response(
-                {'error': 'Cannot create order with empty cart.'}, 
+                {'error': 'Some cart items were not found or do not belong to you.'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        total = sum(item.product.price * item.quantity for item in cart_items)
-        data['total_price'] = total
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @transaction.atomic
+    def checkout(self, data, user, item_ids):
+        """
+        Turn the given cart lines into an order. Returns ``(order, serializer)``,
+        or ``(None, None)`` when a line is missing; raises OutOfStock.
+        """
+        # The whole checkout commits or rolls back as one unit: one query for
+        # the cart lines and their prices, one insert for the order, one bulk
+        # insert for its lines and one delete for the cart. Only the cart rows
+        # are locked (not the products), so a double submit waits here and
+        # then finds its lines already gone.
+        cart_items = list(
+            CartItem.objects.filter(id__in=item_ids, user=user)
+            .select_related('product')
+            .only('id', 'quantity', 'product__id', 'product__name', 'product__price', 'product__stock')
+            .select_for_update(of=('self',))
+        )
+        # Check if all requested items were found
+        if len(cart_items) != len(item_ids):
+            return None, None
+
+        # Limited-run stock: use the holds taken when checkout opened and
+        # take whatever they don't cover with conditional decrements.
+        consume_reservations(user, cart_items)
+
+        data['total_price'] = sum(item.product.price * item.quantity for item in cart_items)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save(user=user)
-        
-        # Try to create OrderItem instances from cart items (new system)
-        try:
-            for cart_item in cart_items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=cart_item.product,
-                    product_name=cart_item.product.name,
-                    price=cart_item.product.price,
-                    quantity=cart_item.quantity
-                )
-            print(f"Created {len(cart_items)} OrderItem instances for order {order.id}")
-        except Exception as e:
-            print(f"Could not create OrderItem instances (table may not exist yet): {e}")
-            # Continue without OrderItem - order will still be created successfully
-        
+
+        order.item_count = sum(item.quantity for item in cart_items)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=item.product.id,
+                product_name=item.product.name,
+                price=item.product.price,
+                quantity=item.quantity,
+            )
+            for item in cart_items
+        ])
+
         # Clear cart after order
-        cart_items.delete()
-        
-        headers = self.get_success_headers(serializer.data)
-        response_data = serializer.data.copy()
-        for field in ['payment_card', 'payment_expiry', 'payment_cvv']:
-            response_data.pop(field, None)
-        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+        CartItem.objects.filter(id__in=item_ids).delete()
+
+        # Commits with the order, so the email is never sent for a rollback.
+        enqueue('orders.send_order_confirmation', {'order_id': order.id})
+        return order, serializer
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,6 +37,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = False  # Disable for production security
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Get allowed hosts from environment or use defaults
 DEFAULT_ALLOWED_HOSTS = '127.0.0.1,localhost,testserver,healthcheck.railway.app,*.railway.app,web-production-c47e.up.railway.app'
@@ -64,6 +66,8 @@ INSTALLED_APPS = [
     'users',
     'orders',
     'api',
+    'jobs',
+    'analytics',
     # Third-party
     'rest_framework',
     'django_filters',
@@ -73,7 +77,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'store.middleware.StaticFilesMiddleware',  # WhiteNoise, plus immutable image variants
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -113,8 +117,29 @@ WSGI_APPLICATION = 'retrostore.wsgi.application'
 if os.environ.get('DATABASE_URL'):
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        # Health checks: a connection that died while idle (server restart,
+        # idle timeout) is replaced before a request gets to use it.
+        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'), conn_health_checks=True)
     }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        # A psycopg 3 connection pool per worker process, so requests reuse
+        # open connections instead of connecting (and TLS handshaking) each
+        # time. Use and wait times are reported at /api/db/pool-stats/.
+        # DB_POOL=False falls back to persistent per-thread connections
+        # (CONN_MAX_AGE), e.g. behind PgBouncer.
+        if os.environ.get('DB_POOL', 'True') == 'True':
+            DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                # Seconds a request waits for a free connection before erroring.
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                # Idle connections above min_size close after max_idle seconds;
+                # every connection is replaced after max_lifetime seconds.
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            }
+        else:
+            DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', 60))
 else:
     DATABASES = {
         'default': {
@@ -124,6 +149,63 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Local memory by default; set REDIS_URL to share the cache (and the catalog
+# version counters) between workers.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'retrostore',
+        }
+    }
+
+# Catalog response cache (store/cache.py)
+CATALOG_CACHE_ALIAS = os.environ.get('CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Seconds a checkout holds limited-run stock (orders/inventory.py); expired
+# holds are returned by `manage.py release_reservations`.
+STOCK_RESERVATION_TTL = int(os.environ.get('STOCK_RESERVATION_TTL', 600))
+
+# Seconds an Idempotency-Key and its stored response are kept (orders/idempotency.py).
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+# Seconds before an unanswered claim on a key counts as abandoned and a retry
+# may take it over; keep it above the server's request timeout.
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 5 * 60))
+
+# Orders older than this many days move to the archive tables (orders/archive.py).
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 365))
+
+# Background jobs (jobs/queue.py, run by `manage.py runworker`)
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 600))
+# Task name -> seconds between runs
+JOB_SCHEDULE = {
+    'orders.release_reservations': 60,
+    'orders.purge_idempotency_keys': 60 * 60,
+    'jobs.purge_finished': 60 * 60,
+    'orders.archive_orders': 24 * 60 * 60,
+    'users.purge_revoked_tokens': 60 * 60,
+}
+
+# Order statuses left out of the sales rollups (analytics/rollups.py).
+SALES_EXCLUDED_STATUSES = ('cancelled', 'refunded')
+
+# Order confirmation emails are sent by the job worker.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'orders@retrogamingstore.local')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -169,6 +251,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # WhiteNoise configuration for serving static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Responsive image variants written by `manage.py build_image_variants`.
+# store/middleware.py serves this folder at /static/variants/ as it is on disk,
+# so variants built on the web service are live without a collectstatic.
+IMAGE_VARIANTS_DIR = BASE_DIR / 'frontend' / 'img' / 'variants'
+IMAGE_VARIANTS_PREFIX = 'variants/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -178,7 +266,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -187,8 +275,22 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Proxies in front of the app (Railway's edge is one). Client IPs for the
+    # throttles are read this many hops from the end of X-Forwarded-For, so
+    # a client can't pick its own by sending the header; 0 uses REMOTE_ADDR.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+    # Budgets for the throttles in api/throttling.py.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.environ.get('THROTTLE_AUTH_IP', '20/min'),
+        'auth_username': os.environ.get('THROTTLE_AUTH_USERNAME', '5/min'),
+        'catalog_anon': os.environ.get('THROTTLE_CATALOG_ANON', '600/min'),
+    },
 }
 
+# Cache holding the throttle counters; use a shared one (Redis) so limits
+# hold across workers.
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+
 # JWT configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -196,8 +298,21 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.VersionedTokenObtainPairSerializer',
+    # Rotated refresh tokens are revoked through users/revocation.py.
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RevokingTokenRefreshSerializer',
 }
 
+# Per-process cache of JWT-authenticated users (users/authentication.py):
+# seconds an entry is trusted, and the most users kept.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+
+# Revoked refresh tokens (users/revocation.py): seconds between each worker's
+# sync from the table, and the revocations its Bloom filter is sized for.
+TOKEN_REVOCATION_SYNC_INTERVAL = int(os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', 30))
+TOKEN_REVOCATION_CAPACITY = int(os.environ.get('TOKEN_REVOCATION_CAPACITY', 100000))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Retro Gaming Store API',
     'DESCRIPTION': 'API documentation for the Retro Gaming Store project.',
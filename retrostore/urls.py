@@ -24,7 +24,7 @@ from store.models import Product
 from django.shortcuts import render
 
 
-def health_check(request):
+async def health_check(request):
     """Simple health check endpoint for Railway"""
     return JsonResponse({'status': 'healthy', 'message': 'Retro Gaming Store is running!'})
 
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import get_search_backend
+
+    conn = connections[using]
+    if 'store_product' not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        get_search_backend(conn).install(cursor)
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        post_migrate.connect(install_search_index, sender=self)
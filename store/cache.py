@@ -0,0 +1,206 @@
+"""
+Response cache for the catalog read endpoints.
+
+Entries are keyed on a version counter plus the normalized query string.
+Writes never delete entries; they bump the counter for the list pages and
+for the touched product, so every key built before the write is simply never
+read again and ages out through the cache TTL.
+"""
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+EPOCH_KEY = 'catalog:epoch'
+LIST_VERSION_KEY = 'catalog:list:v'
+PRODUCT_VERSION_KEY = 'catalog:product:{pk}:v'
+
+
+class CacheStats:
+    """Per-process hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter evicted or never set: any fresh value starts a new generation.
+        cache.add(key, 1, timeout=None)
+        cache.incr(key)
+
+
+def _bump_versions(product_ids):
+    _bump(LIST_VERSION_KEY)
+    for pk in product_ids:
+        _bump(PRODUCT_VERSION_KEY.format(pk=pk))
+
+
+def invalidate_products(*product_ids):
+    """
+    Invalidate the list pages and the given products.
+
+    The bump happens immediately and again on commit, so nothing a concurrent
+    reader caches between the write and the commit survives the transaction.
+    """
+    _bump_versions(product_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(product_ids))
+
+
+def invalidate_catalog():
+    """
+    Invalidate every catalog entry at once. Used by bulk writes (imports,
+    bulk updates) that bypass model signals and touch too many products to
+    bump one by one.
+    """
+    _bump(EPOCH_KEY)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(EPOCH_KEY))
+
+
+def _normalized_query(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    return urlencode(params)
+
+
+def _version_keys(product_id):
+    # List pages can show any product, so they follow the catalog-wide
+    # counter; per-product reads only follow their own product's counter.
+    # Both sit under the epoch that bulk writes bump.
+    if product_id is None:
+        return [EPOCH_KEY, LIST_VERSION_KEY]
+    return [EPOCH_KEY, PRODUCT_VERSION_KEY.format(pk=product_id)]
+
+
+def _version(product_id):
+    epoch, key = _version_keys(product_id)
+    found = get_cache().get_many([epoch, key])
+    return f'{found.get(epoch, 0)}.{found.get(key, 0)}'
+
+
+async def _aversion(product_id):
+    epoch, key = _version_keys(product_id)
+    found = await get_cache().aget_many([epoch, key])
+    return f'{found.get(epoch, 0)}.{found.get(key, 0)}'
+
+
+def _make_key(request, version):
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        _normalized_query(request),
+        version,
+    ])
+    return 'catalog:resp:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def build_key(request, product_id=None):
+    return _make_key(request, _version(product_id))
+
+
+def _cacheable_renderer(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    if request.method != 'GET' or renderer is None or renderer.format != 'json':
+        return None
+    return renderer
+
+
+def _cached(body, renderer, state):
+    response = HttpResponse(body, content_type=renderer.media_type)
+    response['X-Cache'] = state
+    return response
+
+
+def cached_response(request, produce, product_id=None):
+    """
+    Serve a JSON GET from the cache, or call ``produce()`` and store its body.
+
+    Only successful JSON responses are cached; the browsable API and errors
+    always go through ``produce``.
+    """
+    renderer = _cacheable_renderer(request)
+    if renderer is None:
+        return produce()
+
+    cache = get_cache()
+    key = build_key(request, product_id)
+    body = cache.get(key)
+    if body is not None:
+        stats.record(hit=True)
+        return _cached(body, renderer, 'HIT')
+
+    stats.record(hit=False)
+    response = produce()
+    if response.status_code != 200:
+        return response
+    body = renderer.render(response.data, renderer.media_type, {'request': request})
+    cache.set(key, body, get_timeout())
+    return _cached(body, renderer, 'MISS')
+
+
+async def acached_response(request, produce, product_id=None):
+    """``cached_response`` for async views: ``produce`` is a coroutine function."""
+    renderer = _cacheable_renderer(request)
+    if renderer is None:
+        return await produce()
+
+    cache = get_cache()
+    key = _make_key(request, await _aversion(product_id))
+    body = await cache.aget(key)
+    if body is not None:
+        stats.record(hit=True)
+        return _cached(body, renderer, 'HIT')
+
+    stats.record(hit=False)
+    response = await produce()
+    if response.status_code != 200:
+        return response
+    body = renderer.render(response.data, renderer.media_type, {'request': request})
+    await cache.aset(key, body, get_timeout())
+    return _cached(body, renderer, 'MISS')
@@ -0,0 +1,34 @@
+import django_filters
+from rest_framework.filters import SearchFilter, OrderingFilter
+from .models import Product
+from .search import search_products
+
+
+class ProductFilter(django_filters.FilterSet):
+    """Exact brand/platform and indexed range filters on price and release year."""
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    min_year = django_filters.NumberFilter(field_name='release_year', lookup_expr='gte')
+    max_year = django_filters.NumberFilter(field_name='release_year', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['brand', 'platform']
+
+
+class ProductSearchFilter(SearchFilter):
+    """``?search=`` backed by the database full-text index instead of icontains."""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        return search_products(queryset, text)
+
+
+class RelevanceOrderingFilter(OrderingFilter):
+    """Order search results by relevance unless the client asked for an ordering."""
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get(self.ordering_param)
+        if not requested and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', 'id']
+        return super().get_ordering(request, queryset, view)
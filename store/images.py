@@ -0,0 +1,164 @@
+"""
+Responsive image variants for product images.
+
+``build_image_variants`` writes content-hashed resizes of every source image
+into ``IMAGE_VARIANTS_DIR`` together with a ``manifest.json`` that maps each
+source URL to its variants. ``store.middleware`` serves that folder at
+``/static/variants/`` as it is on disk, and the serializer reads the
+manifest to build ``srcset``, leaving out images whose files are missing
+here (a build on another machine).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from io import BytesIO
+
+from django.conf import settings
+
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_WIDTHS = (200, 400, 800)
+HASH_LENGTH = 12
+DOWNLOAD_TIMEOUT = 15
+# Formats Pillow writes for the non-WebP fallback, keyed by source format.
+FALLBACK_FORMATS = {'PNG': ('PNG', 'png'), 'GIF': ('PNG', 'png')}
+
+
+def variants_dir():
+    return str(getattr(settings, 'IMAGE_VARIANTS_DIR'))
+
+
+def variants_url():
+    return settings.STATIC_URL + getattr(settings, 'IMAGE_VARIANTS_PREFIX', 'variants/')
+
+
+def read_source(source):
+    """Return the bytes of a local path or an http(s) URL."""
+    if source.startswith(('http://', 'https://')):
+        request = urllib.request.Request(source, headers={'User-Agent': 'retrostore-image-variants'})
+        with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+            return response.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def _files_exist(out_dir, entry):
+    return all(os.path.exists(os.path.join(out_dir, v['file'])) for v in entry.get('variants', []))
+
+
+def render_variants(key, source, out_dir, widths, previous):
+    """
+    Build the variants of one image. Runs in a worker process.
+
+    Returns ``(key, entry, status)`` where status is ``'built'``, ``'skipped'``
+    (content hash and files unchanged) or an error message. Remote images
+    that already have their files are not downloaded again: a URL is taken
+    to keep its content (``--force`` rebuilds them).
+    """
+    if previous and source.startswith(('http://', 'https://')) and _files_exist(out_dir, previous):
+        return key, previous, 'skipped'
+    try:
+        data = read_source(source)
+    except Exception as e:
+        return key, previous, f'unreadable: {e}'
+
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    if previous and previous.get('hash') == digest and _files_exist(out_dir, previous):
+        return key, previous, 'skipped'
+
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(BytesIO(data))
+        source_format = image.format or 'JPEG'
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        return key, previous, f'not an image: {e}'
+
+    fallback_format, fallback_ext = FALLBACK_FORMATS.get(source_format, ('JPEG', 'jpg'))
+    stem = os.path.splitext(os.path.basename(key.split('?')[0].rstrip('/')))[0] or 'image'
+    stem = ''.join(c if c.isalnum() or c in '-_' else '-' for c in stem)[:40]
+
+    targets = sorted({w for w in widths if w < image.width} | {min(max(widths), image.width)})
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        for fmt, ext in (('WEBP', 'webp'), (fallback_format, fallback_ext)):
+            frame = resized
+            if fmt == 'JPEG' and frame.mode not in ('RGB', 'L'):
+                frame = frame.convert('RGB')
+            name = f'{stem}-{digest}-{width}w.{ext}'
+            path = os.path.join(out_dir, name)
+            if not os.path.exists(path):
+                tmp = f'{path}.{os.getpid()}.tmp'
+                if fmt == 'WEBP':
+                    frame.save(tmp, fmt, quality=80, method=4)
+                else:
+                    frame.save(tmp, fmt, optimize=True)
+                os.replace(tmp, path)
+            variants.append({'file': name, 'width': width, 'format': ext})
+    return key, {'hash': digest, 'variants': variants}, 'built'
+
+
+class Manifest:
+    """Process-wide view of manifest.json, re-read when the file changes."""
+    check_interval = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._mtime = None
+        self._checked = 0
+
+    def path(self):
+        return os.path.join(variants_dir(), MANIFEST_NAME)
+
+    def entries(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self._entries
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path()).st_mtime
+            except OSError:
+                self._entries, self._mtime = {}, None
+                return self._entries
+            if mtime != self._mtime:
+                try:
+                    with open(self.path(), encoding='utf-8') as f:
+                        images = json.load(f).get('images', {})
+                except (OSError, ValueError):
+                    images = {}
+                # Only publish URLs this process can serve.
+                out_dir = variants_dir()
+                self._entries = {key: entry for key, entry in images.items() if _files_exist(out_dir, entry)}
+                self._mtime = mtime
+        return self._entries
+
+    def reload(self):
+        self._checked = 0
+        self._mtime = None
+
+    def srcset(self, image, fmt='webp'):
+        entry = self.entries().get(image)
+        if not entry:
+            return ''
+        base = variants_url()
+        return ', '.join(
+            f"{base}{v['file']} {v['width']}w"
+            for v in entry['variants'] if v['format'] == fmt
+        )
+
+    def thumbnail(self, image):
+        entry = self.entries().get(image)
+        if not entry:
+            return None
+        fallbacks = [v for v in entry['variants'] if v['format'] != 'webp']
+        return variants_url() + fallbacks[0]['file'] if fallbacks else None
+
+
+manifest = Manifest()
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from store.cache import invalidate_catalog
+from store.images import DEFAULT_WIDTHS, MANIFEST_NAME, manifest, render_variants, variants_dir
+from store.models import Product
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+
+class Command(BaseCommand):
+    help = 'Build content-hashed WebP and thumbnail variants of product and frontend images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)),
+                            help='Comma-separated variant widths in pixels')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Size of the process pool')
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild even when the source content hash is unchanged')
+        parser.add_argument('--skip-remote', action='store_true',
+                            help='Do not download http(s) product images')
+
+    def handle(self, *args, **options):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise CommandError('Pillow is required: pip install Pillow')
+        try:
+            widths = sorted({int(w) for w in options['widths'].split(',') if w.strip()})
+        except ValueError:
+            raise CommandError('--widths must be a comma-separated list of integers')
+        if not widths or widths[0] <= 0:
+            raise CommandError('--widths must be positive')
+
+        out_dir = variants_dir()
+        os.makedirs(out_dir, exist_ok=True)
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        previous = self.load_manifest(manifest_path)
+        sources = self.collect_sources(options['skip_remote'])
+
+        started = time.monotonic()
+        images = {}
+        counts = {'built': 0, 'skipped': 0, 'failed': 0}
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = [
+                pool.submit(render_variants, key, source, out_dir, widths,
+                            None if options['force'] else previous.get(key))
+                for key, source in sources.items()
+            ]
+            for future in futures:
+                key, entry, status = future.result()
+                if entry:
+                    images[key] = entry
+                if status in counts:
+                    counts[status] += 1
+                else:
+                    counts['failed'] += 1
+                    self.stdout.write(self.style.WARNING(f'{key}: {status}'))
+
+        tmp = manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'widths': widths, 'images': images}, f, indent=2, sort_keys=True)
+        os.replace(tmp, manifest_path)
+        self.prune(out_dir, images)
+
+        if counts['built']:
+            manifest.reload()
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['built']} built, {counts['skipped']} unchanged, {counts['failed']} failed "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def load_manifest(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f).get('images', {})
+        except (OSError, ValueError):
+            return {}
+
+    def collect_sources(self, skip_remote):
+        """Map each image URL as the site references it to a readable source."""
+        sources = {}
+        skip_dir = os.path.abspath(variants_dir())
+        for directory in settings.STATICFILES_DIRS:
+            directory = os.path.abspath(directory)
+            if not os.path.isdir(directory) or directory == skip_dir:
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    sources[settings.STATIC_URL + name] = os.path.join(directory, name)
+
+        images = Product.objects.exclude(image='').values_list('image', flat=True).distinct()
+        for image in images.iterator():
+            if image in sources:
+                continue
+            if image.startswith(settings.STATIC_URL):
+                path = finders.find(image[len(settings.STATIC_URL):])
+                if path:
+                    sources[image] = path
+            elif image.startswith(('http://', 'https://')) and not skip_remote:
+                sources[image] = image
+        return sources
+
+    def prune(self, out_dir, images):
+        keep = {MANIFEST_NAME} | {v['file'] for entry in images.values() for v in entry['variants']}
+        for name in os.listdir(out_dir):
+            if name not in keep and not name.endswith('.tmp'):
+                os.remove(os.path.join(out_dir, name))
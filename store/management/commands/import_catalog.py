@@ -0,0 +1,133 @@
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.records import RowError, open_source, read_rows, source_format, text, validate_batch
+from store.cache import invalidate_catalog
+from store.models import Product
+
+IMPORT_FIELDS = ['name', 'brand', 'release_year', 'price', 'image', 'description', 'platform']
+REQUIRED_FIELDS = ['name', 'brand', 'release_year', 'price', 'platform']
+UPDATE_FIELDS = [f for f in IMPORT_FIELDS if f not in ('name', 'platform')]
+
+
+def clean_row(raw):
+    """Validate one feed row and return the Product field values."""
+    missing = [f for f in REQUIRED_FIELDS if raw.get(f) in (None, '')]
+    if missing:
+        raise RowError(f'missing {", ".join(missing)}')
+
+    row = {field: text(Product, field, raw.get(field)) for field in IMPORT_FIELDS}
+    try:
+        row['release_year'] = int(row['release_year'])
+    except ValueError:
+        raise RowError('release_year is not an integer')
+    if not 1950 <= row['release_year'] <= 2100:
+        raise RowError('release_year is out of range')
+    try:
+        row['price'] = Decimal(row['price']).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError('price is not a number')
+    if row['price'] < 0 or row['price'] >= Decimal('1000000'):
+        raise RowError('price is out of range')
+    image = row['image']
+    if image and not image.startswith(('/', 'http://', 'https://')):
+        raise RowError('image must be an absolute path or an http(s) URL')
+    return row
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or JSONL product feed into the catalog, upserting on (name, platform)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Feed file path, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Feed format (default: from the file extension, csv for stdin)')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows upserted per transaction')
+        parser.add_argument('--rejects', help='Write rejected rows with their error to this JSONL file')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and print what would change without writing')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        fmt = source_format(source, options['format'])
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        stream = open_source(source)
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        self.totals = {'read': 0, 'rejected': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+        started = time.monotonic()
+        try:
+            rows = read_rows(stream, fmt)
+            while True:
+                # A later duplicate of the same natural key wins within the batch.
+                batch = validate_batch(
+                    islice(rows, batch_size), clean_row, lambda row: (row['name'], row['platform']),
+                    self.totals, rejects,
+                )
+                if batch is None:
+                    break
+                if batch:
+                    self.apply(batch, options['dry_run'])
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{self.totals['read']} rows read, {self.totals['rejected']} rejected "
+                    f"({self.totals['read'] / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        elapsed = time.monotonic() - started
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.totals['read'] - self.totals['rejected']} rows in {elapsed:.1f}s: "
+            f"{self.totals['created']} created, {self.totals['updated']} updated, "
+            f"{self.totals['unchanged']} unchanged, {self.totals['rejected']} rejected"
+        ))
+
+    def apply(self, batch, dry_run):
+        names = {name for name, _ in batch}
+        existing = {
+            (p.name, p.platform): p
+            for p in Product.objects.filter(name__in=names).only('pk', *IMPORT_FIELDS)
+        }
+
+        changed = []
+        for key, row in batch.items():
+            current = existing.get(key)
+            if current is None:
+                self.totals['created'] += 1
+                if dry_run:
+                    self.stdout.write(f'+ {key[0]} ({key[1]})')
+                changed.append(row)
+                continue
+            diff = {f: (getattr(current, f), row[f]) for f in UPDATE_FIELDS if getattr(current, f) != row[f]}
+            if not diff:
+                self.totals['unchanged'] += 1
+                continue
+            self.totals['updated'] += 1
+            if dry_run:
+                changes = ', '.join(f'{f}: {old!r} -> {new!r}' for f, (old, new) in diff.items())
+                self.stdout.write(f'~ {key[0]} ({key[1]}): {changes}')
+            changed.append(row)
+
+        if dry_run or not changed:
+            return
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [Product(**row) for row in changed],
+                update_conflicts=True,
+                unique_fields=['name', 'platform'],
+                update_fields=UPDATE_FIELDS,
+            )
+        # Bulk upserts skip model signals, so drop the whole catalog cache once per batch.
+        invalidate_catalog()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from store.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(connection)
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.install(cursor)
+            backend.rebuild(cursor)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt product search index ({connection.vendor})')
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rating aggregates and comment counts from Rating and Comment rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Products reconciled per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = fixed = comments_fixed = 0
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                batch = Product.objects.filter(pk__in=ids)
+                drifted = batch.reconcile_ratings()
+                comment_fixes = batch.reconcile_comment_counts()
+            for product in drifted:
+                self.stdout.write(
+                    self.style.WARNING(f'Fixed product {product.pk}: {product.rating_count} ratings, avg {product.rating:.2f}')
+                )
+            checked += len(ids)
+            fixed += len(drifted)
+            comments_fixed += comment_fixes
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Checked {checked} products, fixed {fixed} rating aggregates '
+                f'and {comments_fixed} comment counts'
+            )
+        )
@@ -0,0 +1,68 @@
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+from .images import variants_dir, variants_url
+
+# build_image_variants names files <stem>-<content hash>-<width>w.<ext>.
+VARIANT_NAME_RE = re.compile(r'/variants/[\w-]+-[0-9a-f]{12}-\d+w\.(?:webp|png|jpg)$')
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also serves content-hashed image variants as immutable,
+    straight from ``IMAGE_VARIANTS_DIR``: WhiteNoise only knows the files
+    collectstatic copied before startup, and variants built after that would
+    404 until the next deploy.
+
+    WhiteNoise is sync-only, which under ASGI would send every request
+    through a thread just to pass this middleware. This one is async-capable:
+    requests that aren't for a static file go straight on to the async view
+    stack, and only files (opened from disk) are served from a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.lookup(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path_info
+        static_file = None if self.autorefresh else self.files.get(path)
+        if static_file is None and (self.autorefresh or self.is_variant(path)):
+            # Looks on disk.
+            static_file = await sync_to_async(self.lookup)(path)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+    def lookup(self, url):
+        if self.autorefresh:
+            return self.find_file(url)
+        static_file = self.files.get(url)
+        if static_file is None and self.is_variant(url):
+            try:
+                static_file = self.get_static_file(os.path.join(variants_dir(), url.rsplit('/', 1)[1]), url)
+            except MissingFileError:
+                pass
+        return static_file
+
+    def is_variant(self, url):
+        return url.startswith(variants_url()) and VARIANT_NAME_RE.search(url) is not None
+
+    def immutable_file_test(self, path, url):
+        if VARIANT_NAME_RE.search(url):
+            return True
+        return super().immutable_file_test(path, url)
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from store.search import get_search_backend
+
+
+def install_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        get_search_backend(conn).install(cursor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        get_search_backend(conn).uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
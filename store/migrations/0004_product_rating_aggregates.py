@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:43
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Rating = apps.get_model('store', 'Rating')
+    histogram = {f'rating_{score}': Count('pk', filter=Q(score=score)) for score in range(1, 6)}
+    rows = (
+        Rating.objects.order_by()
+        .values('product')
+        .annotate(rating_sum=Sum('score'), rating_count=Count('pk'), **histogram)
+    )
+    products = []
+    for row in rows:
+        product = Product(pk=row.pop('product'), rating=row['rating_sum'] / row['rating_count'], **row)
+        products.append(product)
+    Product.objects.bulk_update(
+        products, ['rating', 'rating_sum', 'rating_count', *histogram], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='score',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
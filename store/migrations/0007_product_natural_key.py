@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_products(apps, schema_editor):
+    # Keep the oldest product of each (name, platform) as it is and suffix
+    # the others "(2)", "(3)", ... before the unique constraint goes on.
+    # Renaming rather than merging leaves their ratings, comments, carts
+    # and orders untouched; an admin can merge them by hand afterwards.
+    Product = apps.get_model('store', 'Product')
+    max_length = Product._meta.get_field('name').max_length
+    duplicates = (
+        Product.objects.order_by()
+        .values('name', 'platform')
+        .annotate(rows=Count('pk'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        products = Product.objects.filter(name=row['name'], platform=row['platform']).order_by('pk')
+        taken = set(Product.objects.filter(platform=row['platform']).values_list('name', flat=True))
+        suffix = 1
+        for product in products[1:]:
+            while True:
+                suffix += 1
+                label = f' ({suffix})'
+                name = row['name'][:max_length - len(label)] + label
+                if name not in taken:
+                    break
+            taken.add(name)
+            Product.objects.filter(pk=product.pk).update(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_products, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('name', 'platform'), name='product_natural_key'),
+        ),
+    ]
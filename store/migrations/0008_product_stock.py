@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+from store.search import FTS_TABLE, SQLiteSearchBackend
+
+
+def narrow_fts_update_trigger(apps, schema_editor):
+    # Recreate the update trigger so it only fires for the indexed columns.
+    conn = schema_editor.connection
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au")
+        SQLiteSearchBackend().install(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_natural_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(narrow_fts_update_trigger, migrations.RunPython.noop),
+    ]
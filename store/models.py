@@ -1,7 +1,176 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
 from django.contrib.auth.models import User
 
 
+RATING_SCORES = range(1, 6)
+# (label, lower bound inclusive, upper bound exclusive) for the price facet.
+PRICE_BUCKETS = [
+    ('0-50', 0, 50),
+    ('50-100', 50, 100),
+    ('100-200', 100, 200),
+    ('200+', 200, None),
+]
+RATING_AGGREGATE_FIELDS = [
+    'rating', 'rating_sum', 'rating_count', *(f'rating_{score}' for score in RATING_SCORES),
+]
+
+
+class ProductQuerySet(models.QuerySet):
+    def facet_counts(self):
+        """
+        Count products per brand, platform, release decade and price bucket.
+
+        One GROUP BY over all four dimensions returns one row per distinct
+        combination, which is then folded into per-facet totals in Python.
+        """
+        bucket = Case(
+            *[
+                When(Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q()), then=Value(label))
+                for label, low, high in PRICE_BUCKETS
+            ],
+            output_field=models.CharField(),
+        )
+        decade = ExpressionWrapper(F('release_year') / 10 * 10, output_field=IntegerField())
+        rows = (
+            self.order_by()
+            .values('brand', 'platform', decade=decade, price_bucket=bucket)
+            .annotate(total=Count('pk'))
+        )
+
+        facets = {'brand': {}, 'platform': {}, 'decade': {}, 'price_bucket': {}}
+        total = 0
+        for row in rows:
+            total += row['total']
+            for name, counts in facets.items():
+                counts[row[name]] = counts.get(row[name], 0) + row['total']
+
+        def ranked(counts):
+            return [
+                {'value': value, 'count': count}
+                for value, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+            ]
+
+        return {
+            'count': total,
+            'brand': ranked(facets['brand']),
+            'platform': ranked(facets['platform']),
+            'decade': [
+                {'value': value, 'count': count}
+                for value, count in sorted(facets['decade'].items())
+            ],
+            'price': [
+                {'value': label, 'min': low, 'max': high, 'count': facets['price_bucket'][label]}
+                for label, low, high in PRICE_BUCKETS
+                if label in facets['price_bucket']
+            ],
+        }
+
+    def apply_rating(self, product_id, added=None, removed=None):
+        """
+        Move one product's rating aggregates by a single added and/or removed
+        score in one UPDATE. Every right-hand side reads the pre-update row, so
+        concurrent raters never lose each other's increments.
+        """
+        if added == removed:
+            return 0
+        delta_sum = (added or 0) - (removed or 0)
+        delta_count = (added is not None) - (removed is not None)
+        new_sum = F('rating_sum') + delta_sum
+        new_count = F('rating_count') + delta_count
+
+        updates = {
+            'rating_sum': new_sum,
+            'rating_count': new_count,
+            'rating': Case(
+                When(GreaterThan(new_count, 0),
+                     then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField())),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        }
+        for score, step in ((added, 1), (removed, -1)):
+            if score in RATING_SCORES:
+                column = f'rating_{score}'
+                updates[column] = F(column) + step
+        return self.filter(pk=product_id).update(**updates)
+
+    def reconcile_ratings(self):
+        """
+        Recompute the rating aggregates of the products in this queryset from
+        their Rating rows with one grouped query, and save only the rows that
+        drifted. Products without ratings keep their stored average.
+        """
+        histogram = {f'rating_{score}': Count('pk', filter=Q(score=score)) for score in RATING_SCORES}
+        actual = {
+            row.pop('product'): row
+            for row in Rating.objects.filter(product__in=self.values('pk'))
+            .order_by()
+            .values('product')
+            .annotate(rating_sum=Sum('score'), rating_count=Count('pk'), **histogram)
+        }
+        fields = RATING_AGGREGATE_FIELDS
+        empty = dict.fromkeys(fields[1:], 0)
+
+        drifted = []
+        for product in self.only('pk', *fields):
+            expected = actual.get(product.pk, empty)
+            if expected['rating_count']:
+                expected = dict(expected, rating=expected['rating_sum'] / expected['rating_count'])
+            if any(getattr(product, name) != value for name, value in expected.items()):
+                for name, value in expected.items():
+                    setattr(product, name, value)
+                drifted.append(product)
+        self.model.objects.bulk_update(drifted, fields, batch_size=500)
+        return drifted
+
+    def apply_comment(self, product_id, delta):
+        return self.filter(pk=product_id).update(comment_count=F('comment_count') + delta)
+
+    def reconcile_comment_counts(self):
+        """Reset comment_count from the Comment rows in one UPDATE; returns rows touched."""
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ), 0)
+        return self.exclude(comment_count=actual).update(comment_count=actual)
+
+    def take_stock(self, product_id, quantity):
+        """
+        Take ``quantity`` units of a stock-tracked product in one conditional
+        UPDATE (``... WHERE stock >= quantity``). Returns False, changing
+        nothing, when there isn't enough left; the row lock lasts only as
+        long as the statement's transaction.
+        """
+        from .cache import invalidate_products
+        taken = self.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+        if taken:
+            invalidate_products(product_id)
+        return bool(taken)
+
+    def return_stock(self, quantities):
+        """Put back ``{product_id: quantity}`` units in one UPDATE; untracked products are skipped."""
+        from .cache import invalidate_products
+        quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return 0
+        returned = self.filter(pk__in=quantities, stock__isnull=False).update(stock=F('stock') + Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            output_field=IntegerField(),
+        ))
+        invalidate_products(*quantities)
+        return returned
+
+
 class Product(models.Model):
     name = models.CharField(max_length=100)
     brand = models.CharField(max_length=50)
@@ -11,20 +180,64 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     platform = models.CharField(max_length=50)
     rating = models.FloatField(default=0)
+    # Running rating aggregates, kept in step with Rating rows by
+    # ProductQuerySet.apply_rating(); `reconcile_ratings` repairs drift.
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Units on hand for limited-run items; null means stock isn't tracked.
+    # Only ever moved by take_stock()/return_stock(), never read-modify-write.
+    stock = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # (sort key, id) pairs back keyset pagination for each ordering_fields value.
+        indexes = [
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['release_year', 'id'], name='product_year_id_idx'),
+            models.Index(fields=['rating', 'id'], name='product_rating_id_idx'),
+            models.Index(fields=['brand'], name='product_brand_idx'),
+            models.Index(fields=['platform'], name='product_platform_idx'),
+        ]
+        constraints = [
+            # Natural key used by import_catalog upserts.
+            models.UniqueConstraint(fields=['name', 'platform'], name='product_natural_key'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating_histogram(self):
+        return {str(score): getattr(self, f'rating_{score}') for score in RATING_SCORES}
+
 
 class Rating(models.Model):
     product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='ratings')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    score = models.PositiveIntegerField()
+    score = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.product.name} - {self.score} by {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        # An update moves the score the row holds now out of the aggregates,
+        # not the one it held when this instance was read: lock the row and
+        # read it, so concurrent re-ratings each apply their own delta.
+        with transaction.atomic(using=kwargs.get('using')):
+            if not self._state.adding and self.pk is not None:
+                self._stored_score = (
+                    Rating.objects.select_for_update().filter(pk=self.pk).values_list('score', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='comments')
@@ -32,5 +245,71 @@ class Comment(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Serves the per-product listing in (created_at, id) order as one range scan.
+        indexes = [
+            models.Index(fields=['product', 'created_at', 'id'], name='comment_product_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.user.username}: {self.text[:30]}"
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    from .cache import invalidate_products
+    invalidate_products(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Rating)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_product_children_cache(sender, instance, **kwargs):
+    from .cache import invalidate_products
+    invalidate_products(instance.product_id)
+
+
+@receiver(post_save, sender=Rating)
+def add_rating_to_aggregates(sender, instance, created, **kwargs):
+    if created:
+        Product.objects.apply_rating(instance.product_id, added=instance.score)
+    elif getattr(instance, '_stored_score', None) is not None:
+        Product.objects.apply_rating(
+            instance.product_id, added=instance.score, removed=instance._stored_score
+        )
+    else:
+        # The row was gone by the time it was locked; recount from scratch.
+        Product.objects.filter(pk=instance.product_id).reconcile_ratings()
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating_from_aggregates(sender, instance, origin=None, **kwargs):
+    # Only deletes of ratings themselves move the aggregates row by row.
+    # Ratings deleted along with their product need nothing, and those
+    # deleted along with a user are recounted once per user (below).
+    if getattr(origin, 'model', type(origin)) is Rating:
+        Product.objects.apply_rating(instance.product_id, removed=instance.score)
+
+
+@receiver(pre_delete, sender=User)
+def remember_rated_products(sender, instance, **kwargs):
+    instance._rated_product_ids = list(
+        Rating.objects.filter(user=instance).order_by().values_list('product_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=User)
+def reconcile_rated_products(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_rated_product_ids', None)
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).reconcile_ratings()
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_to_count(sender, instance, created, **kwargs):
+    if created:
+        Product.objects.apply_comment(instance.product_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_count(sender, instance, **kwargs):
+    Product.objects.apply_comment(instance.product_id, -1)
@@ -0,0 +1,177 @@
+"""
+Full-text search for the product catalog.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers, Postgres
+uses a generated ``tsvector`` column with a GIN index. Both are maintained by
+the database itself, so bulk writes stay indexed without going through
+``Product.save()``.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+PRODUCT_TABLE = 'store_product'
+FTS_TABLE = 'store_product_fts'
+SEARCH_COLUMN = 'search_vector'
+SEARCH_INDEX = 'store_product_search_gin'
+
+
+def tokenize(text):
+    """Split user input into lowercase word tokens, dropping query syntax."""
+    return re.findall(r'\w+', (text or '').lower())
+
+
+class SQLiteSearchBackend:
+    vendor = 'sqlite'
+    triggers = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+    column_weights = (10.0, 4.0, 2.0)
+
+    def is_installed(self, cursor):
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * 4),
+            [FTS_TABLE, *self.triggers],
+        )
+        return len(cursor.fetchall()) == 4
+
+    def install(self, cursor):
+        # SQLite rebuilds a table (dropping its triggers) whenever a migration
+        # alters it, so this runs after every migrate and is a no-op when
+        # everything is still in place.
+        if self.is_installed(cursor):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, brand, description, content='{PRODUCT_TABLE}', content_rowid='id')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, brand, description) "
+            f"VALUES (new.id, new.name, new.brand, new.description); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, description) "
+            f"VALUES ('delete', old.id, old.name, old.brand, old.description); END"
+        )
+        # Only the indexed columns: stock and aggregate counters are updated
+        # far more often and must not rewrite the index entry.
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+            f"AFTER UPDATE OF name, brand, description ON {PRODUCT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, description) "
+            f"VALUES ('delete', old.id, old.name, old.brand, old.description); "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, brand, description) "
+            f"VALUES (new.id, new.name, new.brand, new.description); END"
+        )
+        self.rebuild(cursor)
+
+    def uninstall(self, cursor):
+        for trigger in self.triggers:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+    def rebuild(self, cursor):
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def search(self, queryset, terms):
+        # Every token must match; the trailing * gives prefix matching so
+        # partially typed words from the search box still hit.
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(
+            f"{PRODUCT_TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            [match], output_field=BooleanField(),
+        )
+        # bm25 with per-column weights (name, brand, description) in the same
+        # 1.0/0.4/0.2 proportion as ts_rank's A/B/C defaults on Postgres, so
+        # relevance orders the same in development and production. More
+        # negative means more relevant.
+        weights = ', '.join(str(w) for w in self.column_weights)
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND rowid = {PRODUCT_TABLE}.id)",
+            [match], output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+
+class PostgresSearchBackend:
+    vendor = 'postgresql'
+    config = 'simple'
+
+    def install(self, cursor):
+        cursor.execute(
+            f"ALTER TABLE {PRODUCT_TABLE} ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{self.config}', coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('{self.config}', coalesce(brand, '')), 'B') || "
+            f"setweight(to_tsvector('{self.config}', coalesce(description, '')), 'C')"
+            f") STORED"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON {PRODUCT_TABLE} USING GIN ({SEARCH_COLUMN})"
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+        cursor.execute(f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS {SEARCH_COLUMN}")
+
+    def rebuild(self, cursor):
+        # The generated column cannot drift; rebuilding only compacts the index.
+        cursor.execute(f"REINDEX INDEX {SEARCH_INDEX}")
+
+    def search(self, queryset, terms):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        vector = f"{PRODUCT_TABLE}.{SEARCH_COLUMN}"
+        matches = RawSQL(
+            f"{vector} @@ to_tsquery('{self.config}', %s)",
+            [tsquery], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({vector}, to_tsquery('{self.config}', %s))",
+            [tsquery], output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+
+class FallbackSearchBackend:
+    """Unindexed icontains search for databases without a native engine."""
+    vendor = None
+    fields = ('name', 'brand', 'description')
+
+    def install(self, cursor):
+        pass
+
+    def uninstall(self, cursor):
+        pass
+
+    def rebuild(self, cursor):
+        pass
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(conn=None):
+    conn = conn or connection
+    return BACKENDS.get(conn.vendor, FallbackSearchBackend)()
+
+
+def search_products(queryset, text):
+    """Filter ``queryset`` to products matching ``text`` and annotate ``search_rank``."""
+    terms = tokenize(text)
+    if not terms:
+        return queryset
+    return get_search_backend(connections[queryset.db]).search(queryset, terms)
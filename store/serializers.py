@@ -1,16 +1,48 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from .models import Product, Rating, Comment
+from .images import manifest
 
 
 class ProductSerializer(serializers.ModelSerializer):
-    ratings_count = serializers.SerializerMethodField()
+    ratings_count = serializers.IntegerField(source='rating_count', read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
+    srcset = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = '__all__'
-    
-    def get_ratings_count(self, obj):
-        return obj.ratings.count()
+        exclude = [
+            'rating_sum', 'rating_count',
+            'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+            'comment_count',
+        ]
+        # Stock only moves through take_stock()/return_stock() (and the admin).
+        read_only_fields = ['rating', 'stock']
+        # DRF doesn't derive a validator from Meta.constraints, so without this
+        # a duplicate would reach the database as an IntegrityError.
+        validators = [
+            UniqueTogetherValidator(
+                queryset=Product.objects.all(), fields=['name', 'platform'],
+                message='A product with this name already exists on this platform.',
+            ),
+        ]
+
+    def update(self, instance, validated_data):
+        # Write only the fields sent: a full-row save would put back the
+        # stock count read before a concurrent take_stock().
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+    # WebP variants from build_image_variants; empty until the image has been processed.
+    def get_srcset(self, obj):
+        return manifest.srcset(obj.image)
+
+    def get_thumbnail(self, obj):
+        return manifest.thumbnail(obj.image)
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -1,3 +1,574 @@
+import base64
+import inspect
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import resolve
+from rest_framework.test import APIClient
+from .models import Product, Rating, Comment
+from . import cache as catalog_cache
+from .search import search_products
+from .images import manifest, render_variants
+from .middleware import VARIANT_NAME_RE
+
+
+def make_product(**kwargs):
+    data = {
+        'name': 'Sega Genesis',
+        'brand': 'Sega',
+        'release_year': 1988,
+        'price': '89.99',
+        'platform': 'Genesis',
+    }
+    data.update(kwargs)
+    return Product.objects.create(**data)
+
+
+class CatalogTestCase(TestCase):
+    """Starts every test with an empty catalog response cache and fresh hit/miss counters."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalog_cache.stats.reset()
+
+
+class ProductListQueryTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+
+    def _seed(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = make_product(name=f'Console {i}', release_year=1980 + i)
+            Rating.objects.create(product=product, user=self.user, score=4)
+            Comment.objects.create(product=product, user=self.user, text='Great')
+
+    def test_list_query_count_is_flat(self):
+        # One COUNT for the paginator plus one annotated SELECT, regardless of page size.
+        self._seed(3)
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/?page_size=100')
+        self._seed(30)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/?page_size=100')
+        self.assertEqual(len(response.json()['results']), 33)
+        self.assertEqual(response.json()['results'][0]['ratings_count'], 1)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 1)
+
+    def test_detail_returns_counts(self):
+        product = make_product()
+        Rating.objects.create(product=product, user=self.user, score=5)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.json()['ratings_count'], 1)
+        self.assertEqual(response.json()['comments_count'], 0)
+
+
+class ProductSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        make_product(name='Sega Genesis', brand='Sega', description='16-bit console')
+        make_product(name='Sega Saturn', brand='Sega', description='32-bit console', release_year=1994)
+        make_product(name='Super Nintendo', brand='Nintendo', description='The SNES, rivals the Sega Genesis')
+
+    def _names(self, query):
+        response = self.client.get('/api/products/', {'search': query})
+        return [p['name'] for p in response.json()['results']]
+
+    def test_search_matches_prefixes_of_every_term(self):
+        self.assertEqual(sorted(self._names('sega sat')), ['Sega Saturn'])
+        self.assertEqual(len(self._names('genes')), 2)
+
+    def test_search_ranks_by_relevance(self):
+        # A name hit outranks a description-only hit.
+        self.assertEqual(self._names('genesis')[0], 'Sega Genesis')
+
+    def test_name_and_brand_weigh_more_than_description(self):
+        # Same A/B/C field weights as the Postgres tsvector: one name hit
+        # beats a description that repeats the word.
+        make_product(name='Atari Lynx', brand='Atari', description='Handheld')
+        make_product(name='ComLynx Cable', brand='Atari', description='Lynx to Lynx link, for every Lynx')
+        self.assertEqual(self._names('lynx')[0], 'Atari Lynx')
+
+    def test_explicit_ordering_overrides_relevance(self):
+        response = self.client.get('/api/products/', {'search': 'sega', 'ordering': 'release_year'})
+        self.assertEqual(response.json()['results'][0]['release_year'], 1988)
+
+    def test_index_follows_updates_and_deletes(self):
+        product = Product.objects.get(name='Sega Saturn')
+        product.name = 'Sega Nomad'
+        product.save()
+        self.assertEqual(self._names('saturn'), [])
+        self.assertEqual(self._names('nomad'), ['Sega Nomad'])
+        product.delete()
+        self.assertEqual(self._names('nomad'), [])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(len(self._names('"sega*')), 3)
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        # Duplicate prices exercise the id tiebreaker.
+        for i in range(7):
+            make_product(name=f'Console {i}', price='50.00' if i % 2 else '75.00', release_year=1980 + i)
+
+    def _walk(self, params):
+        seen = []
+        response = self.client.get('/api/products/', dict(params, cursor='', page_size=2))
+        while True:
+            self.assertNotIn('count', response.json())
+            seen.extend(p['id'] for p in response.json()['results'])
+            if not response.json()['next']:
+                return seen
+            response = self.client.get(response.json()['next'])
+
+    def test_walks_every_ordering_without_gaps_or_repeats(self):
+        for ordering in ['price', '-price', 'release_year', '-release_year', 'rating', '-rating']:
+            expected = [p['id'] for p in self.client.get(
+                '/api/products/', {'ordering': ordering, 'page_size': 100}).json()['results']]
+            walked = self._walk({'ordering': ordering})
+            self.assertEqual(sorted(walked), sorted(expected), ordering)
+            self.assertEqual(len(walked), len(set(walked)), ordering)
+
+    def test_page_is_a_single_query(self):
+        first = self.client.get('/api/products/', {'cursor': '', 'page_size': 3})
+        with self.assertNumQueries(1):
+            self.client.get(first.json()['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/products/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values_are_rejected(self):
+        for key, value in [('price', 'abc'), ('price', {}), ('price', None), ('price', 'NaN'), ('rating', [1])]:
+            payload = json.dumps({'k': key, 'v': value, 'id': 1}).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            response = self.client.get('/api/products/', {'ordering': key, 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, (key, value))
+
+    def test_comments_cursor_mode(self):
+        user = User.objects.create_user(username='player1', password='pass12345')
+        product = Product.objects.first()
+        for i in range(5):
+            Comment.objects.create(product=product, user=user, text=f'Comment {i}')
+        url = f'/api/products/{product.id}/comments/'
+        response = self.client.get(url, {'cursor': '', 'page_size': 3})
+        self.assertEqual(len(response.json()['results']), 3)
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIsNone(response.json()['next'])
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        self.product = make_product()
+        self.other = make_product(name='Sega Saturn', platform='Saturn')
+
+    def test_repeat_reads_are_served_from_cache(self):
+        self.client.get('/api/products/', {'ordering': 'price', 'page_size': 5})
+        with self.assertNumQueries(0):
+            # Parameter order does not matter.
+            response = self.client.get('/api/products/?page_size=5&ordering=price')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(catalog_cache.stats.as_dict()['hits'], 1)
+        self.assertEqual(catalog_cache.stats.as_dict()['misses'], 1)
+
+    def test_rating_invalidates_list_and_that_product_only(self):
+        detail = f'/api/products/{self.product.id}/'
+        other_detail = f'/api/products/{self.other.id}/'
+        for url in ('/api/products/', detail, other_detail):
+            self.client.get(url)
+        Rating.objects.create(product=self.product, user=self.user, score=5)
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['ratings_count'], 1)
+        self.assertEqual(self.client.get(other_detail)['X-Cache'], 'HIT')
+
+    def test_comment_action_invalidates_comments(self):
+        url = f'/api/products/{self.product.id}/comments/'
+        self.assertEqual(self.client.get(url).json()['results'], [])
+        self.client.force_authenticate(self.user)
+        self.client.post(url, {'text': 'Blast processing!'})
+        self.assertEqual(len(self.client.get(url).json()['results']), 1)
+
+    def test_product_update_invalidates_detail(self):
+        url = f'/api/products/{self.product.id}/'
+        self.client.get(url)
+        self.product.price = '10.00'
+        self.product.save()
+        self.assertEqual(self.client.get(url).json()['price'], '10.00')
+
+    def test_cache_stats_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/products/cache-stats/').status_code, 401)
+        admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/products/cache-stats/')
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_ratio'})
+
+
+class AsyncCatalogTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product()
+        self.user = User.objects.create_user(username='player1', password='pass12345')
+        for i in range(3):
+            Comment.objects.create(product=self.product, user=self.user, text=f'Comment {i}')
+
+    def test_hot_reads_are_async_views(self):
+        for url in ('/api/products/', f'/api/products/{self.product.id}/',
+                    f'/api/products/{self.product.id}/comments/', '/health/'):
+            self.assertTrue(inspect.iscoroutinefunction(resolve(url).func), url)
+        self.assertFalse(inspect.iscoroutinefunction(resolve('/api/products/facets/').func))
+
+    async def test_reads_through_the_async_client(self):
+        response = await self.async_client.get('/api/products/', {'page_size': 5})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 1)
+        response = await self.async_client.get('/api/products/?page_size=5')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        response = await self.async_client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(response.json()['comments_count'], 3)
+        response = await self.async_client.get(f'/api/products/{self.product.id}/comments/', {'cursor': '', 'page_size': 2})
+        self.assertEqual([c['text'] for c in response.json()['results']], ['Comment 2', 'Comment 1'])
+        self.assertIsNotNone(response.json()['next'])
+
+        for url in ('/api/products/999/', '/api/products/abc/', '/api/products/?page=9'):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 404, url)
+        self.assertEqual((await self.async_client.get('/health/')).json()['status'], 'healthy')
+        # The async-capable static files middleware still serves files.
+        self.assertEqual((await self.async_client.get('/static/cart.js')).status_code, 200)
+
+    def test_writes_and_browsable_api_take_the_sync_path(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(username='admin', password='pass12345'))
+        response = client.post('/api/products/', {
+            'name': 'Neo Geo', 'brand': 'SNK', 'release_year': 1990, 'price': '649.99', 'platform': 'Neo Geo',
+        })
+        self.assertEqual(response.status_code, 201)
+        response = client.get('/api/products/', {'format': 'api'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+        self.assertEqual(client.get('/api/products/').json()['count'], 2)
+
+
+class RatingAggregateTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = make_product()
+        self.users = [
+            User.objects.create_user(username=f'player{i}', password='pass12345') for i in range(3)
+        ]
+
+    def _rate(self, user, score):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/products/{self.product.id}/ratings/', {'score': score})
+
+    def test_insert_update_delete_keep_aggregates_in_step(self):
+        self._rate(self.users[0], 5)
+        response = self._rate(self.users[1], 2)
+        self.assertEqual(response.data['rating_count'], 2)
+        self.assertEqual(response.data['average_rating'], 3.5)
+        self.assertEqual(response.data['rating_histogram'], {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        # Re-rating moves the score instead of adding a vote.
+        response = self._rate(self.users[1], 4)
+        self.assertEqual(response.data['rating_count'], 2)
+        self.assertEqual(response.data['average_rating'], 4.5)
+        self.assertEqual(response.data['rating_histogram']['2'], 0)
+
+        Rating.objects.get(user=self.users[0]).delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum, self.product.rating), (1, 4, 4.0))
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+
+    def test_update_moves_the_stored_score_not_the_one_read(self):
+        stale = Rating.objects.create(product=self.product, user=self.users[0], score=3)
+        fresh = Rating.objects.get(pk=stale.pk)
+        fresh.score = 5
+        fresh.save()
+        # `stale` still thinks the row holds 3.
+        stale.score = 4
+        stale.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (1, 4))
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+
+    def test_cascading_deletes_recount_once(self):
+        other = make_product(name='Sega Saturn', platform='Saturn')
+        for product in (self.product, other):
+            for user, score in zip(self.users, [5, 4, 1]):
+                Rating.objects.create(product=product, user=user, score=score)
+
+        with mock.patch('store.models.ProductQuerySet.apply_rating') as apply_rating:
+            self.users[0].delete()
+            other.delete()
+        apply_rating.assert_not_called()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (2, 5))
+        self.assertEqual(self.product.rating_histogram, {'1': 1, '2': 0, '3': 0, '4': 1, '5': 0})
+
+    def test_out_of_range_score_is_rejected(self):
+        self.assertEqual(self._rate(self.users[0], 6).status_code, 400)
+
+    def test_product_serializer_includes_histogram(self):
+        self._rate(self.users[0], 3)
+        response = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(response.json()['ratings_count'], 1)
+        self.assertEqual(response.json()['rating_histogram']['3'], 1)
+        self.assertNotIn('rating_sum', response.json())
+
+    def test_reconcile_repairs_drift(self):
+        for user, score in zip(self.users, [5, 4, 1]):
+            Rating.objects.create(product=self.product, user=user, score=score)
+        Product.objects.filter(pk=self.product.pk).update(rating_count=99, rating_3=7)
+        call_command('reconcile_ratings', stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (3, 10))
+        self.assertEqual(self.product.rating_histogram, {'1': 1, '2': 0, '3': 0, '4': 1, '5': 1})
+        self.assertAlmostEqual(self.product.rating, 10 / 3)
+
+
+class CommentListingTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = make_product()
+        self.other = make_product(name='Sega Saturn', platform='Saturn')
+        self.users = [
+            User.objects.create_user(username=f'player{i}', password='pass12345') for i in range(4)
+        ]
+        for i in range(25):
+            Comment.objects.create(product=self.product, user=self.users[i % 4], text=f'Comment {i}')
+        Comment.objects.create(product=self.other, user=self.users[0], text='Elsewhere')
+
+    def test_action_is_paginated_newest_first_with_stored_total(self):
+        url = f'/api/products/{self.product.id}/comments/'
+        # Product lookup plus one joined page query: no per-comment user
+        # lookups and no COUNT(*).
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['text'], 'Comment 24')
+        self.assertEqual(data['results'][0]['user_name'], 'player0')
+        with self.assertNumQueries(2):
+            data = self.client.get(data['next']).json()
+        self.assertEqual([c['text'] for c in data['results']], [f'Comment {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next'])
+
+    def test_viewset_filters_by_product(self):
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/comments/', {'product': self.product.id, 'page_size': 5}).data
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 5)
+        data = self.client.get('/api/comments/').data
+        self.assertIsNone(data['count'])
+        self.assertEqual(data['results'][0]['text'], 'Elsewhere')
+        self.assertEqual(self.client.get('/api/comments/', {'product': 'x'}).status_code, 400)
+
+    def test_comment_count_follows_writes(self):
+        Comment.objects.filter(product=self.product).first().delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 24)
+        Product.objects.filter(pk=self.product.pk).update(comment_count=0)
+        Product.objects.reconcile_comment_counts()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 24)
+
+
+class FacetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        make_product(name='NES', brand='Nintendo', platform='NES', release_year=1983, price='99.99')
+        make_product(name='SNES', brand='Nintendo', platform='SNES', release_year=1990, price='119.99')
+        make_product(name='Game Boy', brand='Nintendo', platform='Game Boy', release_year=1989, price='49.99')
+        make_product(name='Genesis', brand='Sega', platform='Genesis', release_year=1988, price='89.99')
+        make_product(name='Neo Geo', brand='SNK', platform='Neo Geo', release_year=1990, price='649.00')
+
+    def test_facets_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['brand'][0], {'value': 'Nintendo', 'count': 3})
+        self.assertEqual(data['decade'], [{'value': 1980, 'count': 3}, {'value': 1990, 'count': 2}])
+        self.assertEqual(
+            [(b['value'], b['count']) for b in data['price']],
+            [('0-50', 1), ('50-100', 2), ('100-200', 1), ('200+', 1)],
+        )
+
+    def test_facets_follow_search_and_filters(self):
+        data = self.client.get('/api/products/facets/', {'brand': 'Nintendo', 'max_year': 1989}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual({p['value'] for p in data['platform']}, {'NES', 'Game Boy'})
+        data = self.client.get('/api/products/facets/', {'search': 'genesis'}).json()
+        self.assertEqual(data['brand'], [{'value': 'Sega', 'count': 1}])
+
+    def test_range_filters(self):
+        response = self.client.get('/api/products/', {'min_price': 90, 'max_price': 200})
+        self.assertEqual({p['name'] for p in response.json()['results']}, {'NES', 'SNES'})
+
+    def test_facets_are_cached_until_a_product_changes(self):
+        self.client.get('/api/products/facets/')
+        self.assertEqual(self.client.get('/api/products/facets/')['X-Cache'], 'HIT')
+        make_product(name='Saturn', brand='Sega', platform='Saturn', release_year=1994)
+        data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['count'], 6)
+
+
+class ImportCatalogTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        make_product(name='Sega Genesis', platform='Genesis', price='89.99')
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def _import(self, *args):
+        out = StringIO()
+        call_command('import_catalog', *args, stdout=out)
+        return out.getvalue()
+
+    def test_api_rejects_a_duplicate_natural_key(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(username='admin', password='pass12345'))
+        data = {'name': 'Sega Genesis', 'brand': 'Sega', 'release_year': 1988, 'price': '79.99', 'platform': 'Genesis'}
+        response = client.post('/api/products/', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.json())
+        self.assertEqual(client.post('/api/products/', dict(data, platform='Mega Drive')).status_code, 201)
+
+    def test_csv_upserts_on_natural_key_in_batches(self):
+        path = self._write('feed.csv', (
+            'name,brand,release_year,price,platform,description\n'
+            'Sega Genesis,Sega,1988,79.99,Genesis,Updated\n'
+            'Sega Genesis,Sega,1989,89.99,Mega Drive,PAL version\n'
+            'Neo Geo AES,SNK,1990,649.00,Neo Geo,\n'
+            'Broken,SNK,nineteen,1.00,Neo Geo,\n'
+        ))
+        rejects = os.path.join(self.tmp.name, 'rejects.jsonl')
+        output = self._import(path, '--batch-size', '2', '--rejects', rejects)
+        self.assertIn('2 created, 1 updated, 0 unchanged, 1 rejected', output)
+        self.assertEqual(Product.objects.count(), 3)
+        genesis = Product.objects.get(name='Sega Genesis', platform='Genesis')
+        self.assertEqual((str(genesis.price), genesis.description), ('79.99', 'Updated'))
+        with open(rejects, encoding='utf-8') as f:
+            rejected = [json.loads(line) for line in f]
+        self.assertEqual(rejected[0]['line'], 5)
+        self.assertIn('release_year', rejected[0]['error'])
+
+        # Re-running the same feed changes nothing; the new rows are searchable.
+        self.assertIn('0 created, 0 updated, 3 unchanged', self._import(path))
+        self.assertEqual(search_products(Product.objects.all(), 'aes').count(), 1)
+
+    def test_jsonl_dry_run_reports_diff_without_writing(self):
+        path = self._write('feed.jsonl', '\n'.join([
+            json.dumps({'name': 'Sega Genesis', 'brand': 'Sega', 'release_year': 1988,
+                        'price': '99.99', 'platform': 'Genesis'}),
+            json.dumps({'name': 'Atari Lynx', 'brand': 'Atari', 'release_year': 1989,
+                        'price': '59.99', 'platform': 'Lynx'}),
+            'not json',
+        ]))
+        output = self._import(path, '--dry-run')
+        self.assertIn("~ Sega Genesis (Genesis): price: Decimal('89.99') -> Decimal('99.99')", output)
+        self.assertIn('+ Atari Lynx (Lynx)', output)
+        self.assertIn('1 created, 1 updated, 0 unchanged, 1 rejected', output)
+        self.assertEqual(Product.objects.count(), 1)
+
+
+class ImageVariantTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        from PIL import Image
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, 'img')
+        self.out = os.path.join(self.src, 'variants')
+        os.makedirs(self.src)
+        Image.new('RGB', (640, 480), 'purple').save(os.path.join(self.src, 'nes.png'))
+        self.product = make_product(image='/static/nes.png')
+        settings_override = self.settings(STATICFILES_DIRS=[self.src], IMAGE_VARIANTS_DIR=self.out)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(manifest.reload)
+
+    def _build(self, *args):
+        out = StringIO()
+        call_command('build_image_variants', '--workers', '1', '--skip-remote', *args, stdout=out)
+        return out.getvalue()
+
+    def test_builds_hashed_variants_and_exposes_srcset(self):
+        self.assertIn('1 built, 0 unchanged', self._build())
+        files = sorted(f for f in os.listdir(self.out) if f != 'manifest.json')
+        # 200w and 400w plus the original 640w, each as WebP and PNG.
+        self.assertEqual(len(files), 6)
+        self.assertTrue(all(VARIANT_NAME_RE.search('/static/variants/' + f) for f in files))
+
+        data = APIClient().get(f'/api/products/{self.product.id}/').json()
+        self.assertRegex(data['srcset'], r'^/static/variants/nes-[0-9a-f]{12}-200w\.webp 200w, .* 640w$')
+        self.assertTrue(data['thumbnail'].endswith('-200w.png'))
+
+    def test_rebuild_skips_unchanged_content(self):
+        self._build()
+        self.assertIn('0 built, 1 unchanged', self._build())
+        self.assertIn('1 built, 0 unchanged', self._build('--force'))
+
+    def test_variants_are_served_without_collectstatic(self):
+        self._build()
+        thumbnail = APIClient().get(f'/api/products/{self.product.id}/').json()['thumbnail']
+        response = self.client.get(thumbnail)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+        self.assertEqual(self.client.get('/static/variants/nes-000000000000-200w.png').status_code, 404)
+
+    def test_images_whose_files_are_missing_are_not_published(self):
+        self._build()
+        for name in os.listdir(self.out):
+            if name != 'manifest.json':
+                os.remove(os.path.join(self.out, name))
+        manifest.reload()
+        data = APIClient().get(f'/api/products/{self.product.id}/').json()
+        self.assertEqual((data['srcset'], data['thumbnail']), ('', None))
 
-# Create your tests here.
+    def test_remote_images_are_not_downloaded_again(self):
+        remote = 'https://picsum.photos/640/480'
+        with open(os.path.join(self.src, 'nes.png'), 'rb') as f:
+            data = f.read()
+        os.makedirs(self.out)
+        with mock.patch('store.images.read_source', return_value=data) as read_source:
+            _, entry, status = render_variants(remote, remote, self.out, [200], None)
+            self.assertEqual(status, 'built')
+            self.assertEqual(render_variants(remote, remote, self.out, [200], entry)[2], 'skipped')
+            self.assertEqual(read_source.call_count, 1)
+            # Local files are still checked for changed content.
+            render_variants('/static/nes.png', 'nes.png', self.out, [200], entry)
+            self.assertEqual(read_source.call_count, 2)
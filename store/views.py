@@ -1,47 +1,119 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from api.async_views import AsyncReadMixin
+from api.pagination import CountedKeysetPagination, KeysetOptInPagination
+from api.throttling import CatalogAnonThrottle
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Avg
-from .models import Product, Rating, Comment
+from .filters import ProductFilter, ProductSearchFilter, RelevanceOrderingFilter
+from .models import Product, Rating, Comment, RATING_AGGREGATE_FIELDS
+from . import cache as catalog_cache
 from .serializers import ProductSerializer, RatingSerializer, CommentSerializer
 
 
-class ProductPagination(PageNumberPagination):
+class ProductPagination(KeysetOptInPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_ordering = '-release_year'
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class CommentPagination(CountedKeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-created_at'
+
+
+class ProductViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_classes = [CatalogAnonThrottle]
     pagination_class = ProductPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    search_fields = ['name', 'brand', 'description']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RelevanceOrderingFilter]
+    filterset_class = ProductFilter
     ordering_fields = ['price', 'release_year', 'rating']
     ordering = ['-release_year']
+    # The hot catalog reads run natively async; writes stay on the sync path.
+    async_actions = ('list', 'retrieve', 'comments')
+
+    def list(self, request, *args, **kwargs):
+        return catalog_cache.cached_response(
+            request, lambda: super(ProductViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return catalog_cache.cached_response(
+            request,
+            lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs),
+            product_id=kwargs.get(self.lookup_field),
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await catalog_cache.acached_response(
+            request, lambda: super(ProductViewSet, self).alist(request, *args, **kwargs)
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await catalog_cache.acached_response(
+            request,
+            lambda: super(ProductViewSet, self).aretrieve(request, *args, **kwargs),
+            product_id=kwargs.get(self.lookup_field),
+        )
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Brand/platform/decade/price counts for the current search and filters"""
+        return catalog_cache.cached_response(
+            request,
+            lambda: Response(self.filter_queryset(self.get_queryset()).facet_counts()),
+        )
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """Admin-only: catalog response cache hit/miss counters for this worker"""
+        return Response(catalog_cache.stats.as_dict())
 
     @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
     def comments(self, request, pk=None):
-        product = self.get_object()
-        
         if request.method == 'GET':
-            comments = Comment.objects.filter(product=product).order_by('-created_at')
-            serializer = CommentSerializer(comments, many=True)
-            return Response(serializer.data)
+            return catalog_cache.cached_response(
+                request, lambda: self._list_comments(request), product_id=pk
+            )
         
-        elif request.method == 'POST':
-            serializer = CommentSerializer(data=request.data)
-            
-            if serializer.is_valid():
-                serializer.save(product=product, user=request.user)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        product = self.get_object()
+        serializer = CommentSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            serializer.save(product=product, user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _list_comments(self, request):
+        product = self.get_object()
+        comments = Comment.objects.filter(product=product).select_related('user').order_by('-created_at')
+        paginator = CommentPagination()
+        paginator.count = product.comment_count
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    async def acomments(self, request, pk=None):
+        return await catalog_cache.acached_response(
+            request, lambda: self._alist_comments(request), product_id=pk
+        )
+
+    async def _alist_comments(self, request):
+        product = await self.aget_object()
+        comments = Comment.objects.filter(product=product).select_related('user').order_by('-created_at')
+        paginator = CommentPagination()
+        paginator.count = product.comment_count
+        page = await paginator.apaginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['delete'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
     def delete_comment(self, request, pk=None):
@@ -55,7 +127,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             comment = Comment.objects.get(id=comment_id, product=product)
             
             # Check if user owns the comment
-            if comment.user != request.user:
+            if comment.user_id != request.user.id:
                 return Response({'error': 'You can only delete your own comments'}, status=status.HTTP_403_FORBIDDEN)
             
             comment.delete()
@@ -75,7 +147,8 @@ class ProductViewSet(viewsets.ModelViewSet):
             response_data = {
                 'user_rating': RatingSerializer(user_rating).data if user_rating else None,
                 'average_rating': product.rating,
-                'rating_count': product.ratings.count()
+                'rating_count': product.rating_count,
+                'rating_histogram': product.rating_histogram,
             }
             return Response(response_data)
         
@@ -91,17 +164,16 @@ class ProductViewSet(viewsets.ModelViewSet):
                 serializer = RatingSerializer(data=request.data)
             
             if serializer.is_valid():
+                # Saving the rating moves the product's running aggregates
+                # with a single F() update (see Product.objects.apply_rating).
                 serializer.save(product=product, user=request.user)
-                
-                # Update product's average rating
-                avg_rating = Rating.objects.filter(product=product).aggregate(Avg('score'))['score__avg']
-                product.rating = avg_rating or 0
-                product.save()
+                product.refresh_from_db(fields=RATING_AGGREGATE_FIELDS)
                 
                 return Response({
                     'success': True,
                     'average_rating': product.rating,
-                    'rating_count': product.ratings.count()
+                    'rating_count': product.rating_count,
+                    'rating_histogram': product.rating_histogram,
                 })
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -115,12 +187,30 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
+
+    def get_product_id(self):
+        product_id = self.kwargs.get('product_pk') or self.request.query_params.get('product')
+        if product_id and not str(product_id).isdigit():
+            raise ValidationError({'product': 'A valid integer is required.'})
+        return product_id
 
     def get_queryset(self):
-        product_id = self.kwargs.get('product_pk')
+        queryset = Comment.objects.select_related('user').order_by('-created_at')
+        product_id = self.get_product_id()
+        if product_id:
+            return queryset.filter(product_id=product_id)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # The total comes from the product's stored counter; the unfiltered
+        # feed has no cheap total and reports none.
+        product_id = self.get_product_id()
         if product_id:
-            return Comment.objects.filter(product_id=product_id)
-        return Comment.objects.all()
+            self.paginator.count = (
+                Product.objects.filter(pk=product_id).values_list('comment_count', flat=True).first() or 0
+            )
+        return super().paginate_queryset(queryset)
 
     def perform_create(self, serializer):
         product_id = self.kwargs.get('product_pk')
@@ -133,7 +223,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         comment = self.get_object()
         
         # Check if user owns the comment
-        if comment.user != request.user:
+        if comment.user_id != request.user.id:
             return Response({'error': 'You can only delete your own comments'}, status=status.HTTP_403_FORBIDDEN)
         
         comment.delete()
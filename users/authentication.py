@@ -0,0 +1,126 @@
+"""
+JWT authentication with a per-process cache of the resolved user.
+
+Every token carries the user's ``auth_version`` (``Profile.auth_version``)
+from when it was issued. A cache entry holds the user loaded from the
+database together with that version, so a request whose token matches a
+fresh entry needs no query at all. Changing the password or deactivating
+the account bumps the version: tokens issued before are refused as soon as
+their user is next loaded, which is at most ``AUTH_USER_CACHE_TTL`` seconds
+later on other workers and immediately on the worker that made the change.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+AUTH_VERSION_CLAIM = 'auth_version'
+
+
+class PrincipalCache:
+    """A thread-safe LRU of ``user id -> (auth version, user, expiry)`` with hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version or entry[2] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, version, user):
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        size = getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000)
+        with self._lock:
+            self._entries[user_id] = (version, user, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+principals = PrincipalCache()
+
+
+def auth_version(user):
+    profile = getattr(user, 'profile', None)
+    return profile.auth_version if profile is not None else 0
+
+
+def bump_auth_version(user_id):
+    """Invalidate every token issued to the user so far."""
+    from .models import Profile
+    if not Profile.objects.filter(user_id=user_id).update(auth_version=F('auth_version') + 1):
+        Profile.objects.get_or_create(user_id=user_id, defaults={'auth_version': 1})
+    principals.evict(user_id)
+
+
+def tokens_for(user):
+    """A refresh token (and, through it, an access token) stamped with the user's auth version."""
+    refresh = RefreshToken.for_user(user)
+    refresh[AUTH_VERSION_CLAIM] = auth_version(user)
+    return refresh
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that serves the user from ``principals`` when it can."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        version = validated_token.get(AUTH_VERSION_CLAIM, 0)
+
+        user = principals.get(user_id, version)
+        if user is None:
+            try:
+                user = User.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            if not user.is_active:
+                raise AuthenticationFailed('User is inactive', code='user_inactive')
+            if auth_version(user) != version:
+                raise AuthenticationFailed('Token is no longer valid', code='token_revoked')
+            principals.set(user_id, version, user)
+        # Each request gets its own copy, so nothing a view sets on
+        # request.user leaks into other requests.
+        return copy.copy(user)
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from api.records import RowError, open_source, read_rows, source_format, text, validate_batch
+from users.models import Profile
+
+ROLES = {role for role, _ in Profile.USER_ROLES}
+
+
+def clean_row(raw):
+    """Validate one customer record and return the User fields plus ``password``/``password_hash`` and ``role``."""
+    row = {field: text(User, field, raw.get(field)) for field in ('username', 'email', 'first_name', 'last_name')}
+    if not row['username']:
+        raise RowError('missing username')
+    try:
+        UnicodeUsernameValidator()(row['username'])
+        if row['email']:
+            validate_email(row['email'])
+    except ValidationError as e:
+        raise RowError(' '.join(e.messages))
+
+    password, password_hash = raw.get('password') or '', raw.get('password_hash') or ''
+    if password and password_hash:
+        raise RowError('give either password or password_hash, not both')
+    if password_hash:
+        try:
+            identify_hasher(password_hash)
+        except ValueError:
+            raise RowError('password_hash is not in a format Django recognises')
+    row['password'] = str(password)
+    row['password_hash'] = str(password_hash)
+
+    row['role'] = (raw.get('role') or 'user').strip()
+    if row['role'] not in ROLES:
+        raise RowError(f"role must be one of {', '.join(sorted(ROLES))}")
+    return row
+
+
+def _init_worker(settings_module):
+    # Spawned (non-fork) workers start without Django configured.
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def _hash(password):
+    # No password at all: an unusable one, as create_user(password=None) sets.
+    return make_password(password or None)
+
+
+class Command(BaseCommand):
+    help = 'Stream customer records (CSV or JSONL) into new users and profiles, hashing passwords in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Records file path, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Record format (default: from the file extension, csv for stdin)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users inserted per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing passwords (1 hashes in this process)')
+        parser.add_argument('--rejects', help='Write rejected records with their error to this JSONL file')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        fmt = source_format(source, options['format'])
+        batch_size, workers = options['batch_size'], options['workers']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        stream = open_source(source)
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'retrostore.settings'),),
+            )
+        self.totals = {'read': 0, 'rejected': 0, 'created': 0, 'existing': 0, 'hashed': 0}
+        started = time.monotonic()
+        try:
+            rows = read_rows(stream, fmt)
+            while True:
+                # A later duplicate of the same username wins within the batch;
+                # plaintext passwords are never written back out.
+                batch = validate_batch(
+                    islice(rows, batch_size), clean_row, lambda row: row['username'],
+                    self.totals, rejects, redact=('password',),
+                )
+                if batch is None:
+                    break
+                if batch:
+                    self.apply(batch, pool, batch_size, workers)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{self.totals['read']} records read, {self.totals['created']} users created "
+                    f"({self.totals['created'] / elapsed if elapsed else 0:.0f} users/s)"
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisioned {self.totals['created']} users in {elapsed:.1f}s "
+            f"({self.totals['hashed']} passwords hashed with {workers} worker(s)): "
+            f"{self.totals['existing']} already existed, {self.totals['rejected']} rejected"
+        ))
+
+    def apply(self, batch, pool, batch_size, workers):
+        existing = set(User.objects.filter(username__in=batch).values_list('username', flat=True))
+        self.totals['existing'] += len(existing)
+        rows = [row for username, row in batch.items() if username not in existing]
+        if not rows:
+            return
+
+        # PBKDF2 is the slow part: spread it over the pool, in chunks so each
+        # worker gets a few round trips per batch rather than one per user.
+        plain = [row['password'] for row in rows if not row['password_hash']]
+        if pool and plain:
+            hashes = iter(pool.map(_hash, plain, chunksize=max(len(plain) // (workers * 4), 1)))
+        else:
+            hashes = iter(map(_hash, plain))
+        self.totals['hashed'] += len(plain)
+        users = [
+            User(
+                username=row['username'], email=row['email'],
+                first_name=row['first_name'], last_name=row['last_name'],
+                password=row['password_hash'] or next(hashes),
+            )
+            for row in rows
+        ]
+
+        # bulk_create sends no post_save, so profiles are created here, in
+        # the same transaction, instead of one get_or_create per user.
+        with transaction.atomic():
+            users = User.objects.bulk_create(users, batch_size=batch_size)
+            if any(user.pk is None for user in users):
+                # Databases that can't return ids from a bulk insert.
+                ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'pk'))
+                for user in users:
+                    user.pk = ids[user.username]
+            Profile.objects.bulk_create(
+                [Profile(user=user, role=batch[user.username]['role']) for user in users],
+                batch_size=batch_size,
+            )
+        self.totals['created'] += len(users)
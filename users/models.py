@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
 # Create your models here.
@@ -13,12 +13,49 @@ class Profile(models.Model):
     )
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=10, choices=USER_ROLES, default='user')
+    # Stamped into issued JWTs; bumping it invalidates them (users/authentication.py).
+    auth_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
 
+class RevokedToken(models.Model):
+    """A refresh token that may no longer be used, kept until it would have expired (users/revocation.py)."""
+    jti = models.CharField(max_length=255, unique=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='revoked_token_expires_idx'),
+        ]
+
+    def __str__(self):
+        return self.jti
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def detect_credential_change(sender, instance, update_fields=None, **kwargs):
+    # Only saves that may touch the password or the active flag are checked;
+    # last_login updates on every login are not.
+    if instance.pk is None or (update_fields is not None and not {'password', 'is_active'} & set(update_fields)):
+        return
+    stored = User.objects.filter(pk=instance.pk).values('password', 'is_active').first()
+    instance._credentials_changed = stored is not None and (
+        stored['password'] != instance.password or (stored['is_active'] and not instance.is_active)
+    )
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credential_change(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_credentials_changed', False):
+        from .authentication import bump_auth_version
+        bump_auth_version(instance.pk)
+        instance._credentials_changed = False
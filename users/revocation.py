@@ -0,0 +1,147 @@
+"""
+Revoked refresh tokens.
+
+A refresh token is revoked when it is rotated (``/api/auth/token/refresh/``
+with ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION``) or on
+logout. Revocations are rows of ``RevokedToken``, whose unique ``jti`` makes
+the rotating insert itself the authoritative check: two workers can never
+both rotate the same token. Each worker also mirrors the table in memory (a
+Bloom filter in front of an exact ``jti -> expiry`` map, loaded on first use
+and topped up from the table every ``TOKEN_REVOCATION_SYNC_INTERVAL``
+seconds), so replaying a known-revoked token is refused without touching
+the database and a fresh token passes the Bloom filter in a few hash
+lookups. Entries are dropped once the token would have expired anyway.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings: no false negatives, ``error_rate`` false positives at ``capacity``."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((a + i * b) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def _expiry(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+class RevocationStore:
+    """The per-process mirror of ``RevokedToken``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._expires = {}
+            self._bloom = None
+            self._last_id = 0
+            self._synced_at = None
+            self.checks = self.bloom_passes = self.memory_hits = 0
+
+    def _rebuild(self):
+        capacity = max(getattr(settings, 'TOKEN_REVOCATION_CAPACITY', 100000), len(self._expires) * 2)
+        self._bloom = BloomFilter(capacity)
+        for jti in self._expires:
+            self._bloom.add(jti)
+
+    def _remember(self, jti, expires_at):
+        self._expires[jti] = expires_at
+        self._bloom.add(jti)
+
+    def _sync(self):
+        """Load revocations made since the last sync (all of them the first time); drop expired ones."""
+        now = timezone.now()
+        interval = getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 30)
+        if self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+            return
+        if self._bloom is None:
+            self._rebuild()
+        rows = RevokedToken.objects.filter(pk__gt=self._last_id, expires_at__gt=now).order_by('pk')
+        for pk, jti, expires_at in rows.values_list('pk', 'jti', 'expires_at').iterator():
+            self._remember(jti, expires_at)
+            self._last_id = pk
+        expired = [jti for jti, expires_at in self._expires.items() if expires_at <= now]
+        for jti in expired:
+            del self._expires[jti]
+        # A Bloom filter can't forget, so rebuild it once expired entries pile up.
+        if len(expired) > len(self._expires):
+            self._rebuild()
+        self._synced_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        """True when this worker knows ``jti`` is revoked. Usually answered from memory alone."""
+        with self._lock:
+            self._sync()
+            self.checks += 1
+            if jti not in self._bloom:
+                return False
+            self.bloom_passes += 1
+            if jti in self._expires:
+                self.memory_hits += 1
+                return True
+            return False
+
+    def revoke(self, token):
+        """
+        Revoke a refresh token. Returns False when it was already revoked
+        (here or by another worker), which a rotation must treat as reuse.
+        """
+        jti, expires_at = token[api_settings.JTI_CLAIM], _expiry(token)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            revoked = False
+        else:
+            revoked = True
+        with self._lock:
+            if self._bloom is None:
+                self._rebuild()
+            self._remember(jti, expires_at)
+        return revoked
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._expires),
+                'checks': self.checks,
+                'bloom_passes': self.bloom_passes,
+                'memory_hits': self.memory_hits,
+            }
+
+
+revocations = RevocationStore()
+
+
+def purge_expired():
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.models import User
+from .authentication import tokens_for
 from .models import Profile
+from .revocation import revocations
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,4 +19,36 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = ['id', 'user', 'role'] 
\ No newline at end of file
+        fields = ['id', 'user', 'role']
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues tokens carrying the user's auth version (see users/authentication.py)."""
+
+    @classmethod
+    def get_token(cls, user):
+        return tokens_for(user)
+
+
+class RevokingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refuses revoked refresh tokens, checked in memory, and revokes each
+    token it rotates. The revoking insert fails for a token that another
+    request already rotated, so a stolen token can't be used alongside its
+    owner's.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocations.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token is revoked')
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revocations.revoke(refresh):
+                raise InvalidToken('Token is revoked')
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
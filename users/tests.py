@@ -1,3 +1,213 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .authentication import AUTH_VERSION_CLAIM, principals
+from .models import Profile, RevokedToken
+from .revocation import BloomFilter, purge_expired, revocations
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        principals.clear()
+        self.user = User.objects.create_user(username='player1', password='pass12345!x')
+        self.client = APIClient()
+
+    def login(self, password='pass12345!x'):
+        response = self.client.post('/api/auth/token/', {'username': 'player1', 'password': password})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get(self, access, path='/api/users/'):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_user_is_loaded_once_then_served_from_the_cache(self):
+        access = self.login()['access']
+        with self.assertNumQueries(3):
+            # The user (with profile), then the view's count and page.
+            self.assertEqual(self.get(access).status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get(access).status_code, 200)
+        self.assertEqual((principals.hits, principals.misses), (1, 1))
+
+    def test_password_change_revokes_old_tokens_and_returns_new_ones(self):
+        tokens = self.login()
+        other_session = self.login()['access']
+        self.get(other_session)
+
+        response = self.client.patch(
+            f'/api/users/{self.user.pk}/', {'password': 'n3w-pass-word!'},
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(other_session).status_code, 401)
+        self.assertEqual(self.get(tokens['access']).status_code, 401)
+        self.assertEqual(self.get(response.data['access']).status_code, 200)
+
+        # Tokens issued after the change carry the new version.
+        self.assertEqual(self.get(self.login('n3w-pass-word!')['access']).status_code, 200)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.auth_version, 1)
+
+    def test_deactivation_revokes_tokens(self):
+        access = self.login()['access']
+        self.get(access)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(access).status_code, 401)
+
+    def test_other_saves_keep_tokens_valid(self):
+        access = self.login()['access']
+        self.user.email = 'p1@example.com'
+        self.user.save()
+        self.assertEqual(self.get(access).status_code, 200)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.auth_version, 0)
+
+    def test_tokens_carry_the_auth_version(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.assertEqual(AccessToken(self.login()['access'])[AUTH_VERSION_CLAIM], 0)
+
+    def test_stats_are_admin_only(self):
+        access = self.login()['access']
+        self.assertEqual(self.get(access, '/api/users/auth-cache-stats/').status_code, 403)
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'pass12345')
+        self.client.force_authenticate(admin)
+        self.assertIn('hit_ratio', self.client.get('/api/users/auth-cache-stats/').data)
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        revocations.reset()
+        User.objects.create_user(username='player1', password='pass12345!x')
+        self.client = APIClient()
+        self.refresh = self.client.post(
+            '/api/auth/token/', {'username': 'player1', 'password': 'pass12345!x'}
+        ).data['refresh']
+
+    def rotate(self, refresh):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+
+    def test_rotated_tokens_cannot_be_reused(self):
+        response = self.rotate(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+        # Refused from memory, without a query.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rotate(self.refresh).status_code, 401)
+        self.assertEqual(revocations.stats()['memory_hits'], 1)
+        self.assertEqual(self.rotate(response.data['refresh']).status_code, 200)
+
+    def test_a_fresh_token_costs_one_insert(self):
+        # The first check loads the table; after that only the revoking insert
+        # (inside a savepoint) touches the database.
+        revocations.is_revoked('warm-up')
+        with self.assertNumQueries(3):
+            self.assertEqual(self.rotate(self.refresh).status_code, 200)
+
+    def test_revocations_by_other_workers_are_caught(self):
+        # Another worker rotated the token: this one only learns it from the table.
+        from rest_framework_simplejwt.tokens import RefreshToken
+        RevokedToken.objects.create(jti=RefreshToken(self.refresh)['jti'], expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.rotate(self.refresh).status_code, 401)
+
+        # A later worker loads the table on first use.
+        revocations.reset()
+        self.assertTrue(revocations.is_revoked(RefreshToken(self.refresh)['jti']))
+
+    def test_logout_revokes_the_refresh_token(self):
+        self.assertEqual(self.client.post('/api/logout/', {'refresh': self.refresh}).status_code, 200)
+        self.assertEqual(self.rotate(self.refresh).status_code, 401)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_expired_revocations_are_purged(self):
+        RevokedToken.objects.create(jti='old', expires_at=timezone.now() - timedelta(seconds=1))
+        self.rotate(self.refresh)
+        self.assertEqual(purge_expired(), 1)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+
+class ProvisionUsersTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.hash = make_password('imported-pass')
+
+    def write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def provision(self, path, *args):
+        out = StringIO()
+        call_command('provision_users', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_users_and_profiles_from_csv(self):
+        User.objects.create_user(username='taken', password='pass12345!x')
+        path = self.write('customers.csv', (
+            'username,email,password,password_hash,role\n'
+            f'alice,alice@example.com,,{self.hash},user\n'
+            'bob,bob@example.com,plain-pass-1,,admin\n'
+            'carol,,plain-pass-2,,\n'
+            'taken,t@example.com,whatever,,\n'
+            'bad name!,x@example.com,pw,,\n'
+            'dave,not-an-email,pw,,\n'
+        ))
+        rejects = os.path.join(self.dir.name, 'rejects.jsonl')
+        out = self.provision(path, '--workers', '2', '--rejects', rejects)
+        self.assertIn('Provisioned 3 users', out)
+        self.assertIn('1 already existed, 2 rejected', out)
+
+        self.assertTrue(User.objects.get(username='alice').check_password('imported-pass'))
+        self.assertTrue(User.objects.get(username='bob').check_password('plain-pass-1'))
+        self.assertEqual(Profile.objects.get(user__username='bob').role, 'admin')
+        self.assertEqual(Profile.objects.filter(user__username__in=['alice', 'bob', 'carol']).count(), 3)
+        with open(rejects, encoding='utf-8') as f:
+            rejected = [json.loads(line) for line in f]
+        self.assertEqual([r['line'] for r in rejected], [6, 7])
+        self.assertNotIn('password', rejected[0]['row'])
+
+    def test_batches_take_a_flat_number_of_queries(self):
+        def records(start, count):
+            return ''.join(
+                json.dumps({'username': f'user{i}', 'password_hash': self.hash}) + '\n'
+                for i in range(start, start + count)
+            )
+        small = self.write('small.jsonl', records(0, 5))
+        large = self.write('large.jsonl', records(5, 60))
+        with CaptureQueriesContext(connection) as few:
+            self.provision(small, '--workers', '1')
+        with CaptureQueriesContext(connection) as many:
+            self.provision(large, '--workers', '1')
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(User.objects.count(), 65)
+        self.assertEqual(Profile.objects.count(), 65)
 
-# Create your tests here.
+    def test_users_without_a_password_cannot_log_in(self):
+        path = self.write('nopass.jsonl', json.dumps({'username': 'erin'}) + '\n')
+        self.provision(path, '--workers', '1')
+        self.assertFalse(User.objects.get(username='erin').has_usable_password())
@@ -1,13 +1,20 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
+from .authentication import principals, tokens_for
 from .models import Profile
 from .serializers import UserSerializer, ProfileSerializer
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate, login, logout
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+from api.throttling import AuthIPThrottle, AuthUsernameThrottle
+from .revocation import revocations
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -48,7 +55,18 @@ class UserViewSet(viewsets.ModelViewSet):
                 return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
         
         user.save()
-        return Response(UserSerializer(user).data)
+        data = UserSerializer(user).data
+        if password:
+            # The password change revoked every earlier token (the auth
+            # version was bumped on save); hand this session new ones.
+            refresh = tokens_for(user)
+            data.update(access=str(refresh.access_token), refresh=str(refresh))
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='auth-cache-stats', permission_classes=[permissions.IsAdminUser])
+    def auth_cache_stats(self, request):
+        """Admin-only: JWT user cache hit/miss counters for this worker"""
+        return Response(principals.as_dict())
 
 
 class ProfileViewSet(viewsets.ModelViewSet):
@@ -59,6 +77,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
 
 class RegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
 
     def post(self, request):
         username = request.data.get('username')
@@ -79,6 +98,7 @@ class RegistrationView(APIView):
 
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
 
     def post(self, request):
         username = request.data.get('username')
@@ -90,7 +110,21 @@ class LoginView(APIView):
         return Response({'error': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    # Each attempt runs a full password hash, so it shares the login budget.
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
+
+
 class LogoutView(APIView):
+    # Revoking a refresh token only takes holding it, so no login is needed.
+    permission_classes = [permissions.AllowAny]
+
     def post(self, request):
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                revocations.revoke(RefreshToken(refresh))
+            except TokenError:
+                pass  # Expired or malformed: nothing left to revoke.
         logout(request)
         return Response({'success': 'Logged out successfully.'})